@@ -1,5 +1,5 @@
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, DefaultHttpxClient, Timeout, DEFAULT_CONNECTION_LIMITS
 from dotenv import load_dotenv, find_dotenv
 import os
 import vimeo
@@ -7,6 +7,8 @@ import re
 import logging
 from utils import *
 import math
+import itertools
+from collections import deque
 
 # Load environment variables
 _ = load_dotenv(find_dotenv())
@@ -15,6 +17,79 @@ _ = load_dotenv(find_dotenv())
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Paralelismo da transcrição (configurável via .env)
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "4"))
+TRANSCRIPTION_RETRIES = int(os.getenv("TRANSCRIPTION_RETRIES", "3"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # chunks prontos aguardando transcrição
+
+# Parâmetros que determinam o conteúdo do resumo (entram na impressão digital do job,
+# junto com TRANSCRIPTION_PARAMS, definido em utils)
+SUMMARY_MAX_TOKENS = 150
+SUMMARY_TEMPERATURE = 0.4
+
+SUMMARY_SYSTEM_PROMPT = """Você é um especialista em criar resumos estruturados em português do Brasil.
+Para cada segmento, forneça um resumo EXATAMENTE neste formato:
+
+Título do tópico: Explicação concisa e direta do conteúdo.
+
+O título deve ser curto e direto, seguido de dois pontos.
+A explicação deve ser uma única frase clara e informativa.
+Cada resumo deve ter exatamente uma linha com o título e a explicação.
+
+Exemplo exato do formato:
+Curso Intensivo sobre Nietzsche: O curso foca em uma das obras mais significativas de Nietzsche, considerada por alguns como uma das maiores contribuições da humanidade."""
+
+# Vários grupos por requisição: o prompt de sistema é enviado uma vez por lote e a resposta
+# vem como um array JSON, validado item a item (1 desativa o modo em lote)
+SUMMARY_BATCH_GROUPS = int(os.getenv("SUMMARY_BATCH_GROUPS", "8"))
+SUMMARY_BATCH_SYSTEM_PROMPT = """Você é um especialista em criar resumos estruturados em português do Brasil.
+Você receberá vários segmentos numerados de uma transcrição. Para cada segmento, escreva um resumo EXATAMENTE neste formato:
+
+Título do tópico: Explicação concisa e direta do conteúdo.
+
+O título deve ser curto e direto, seguido de dois pontos.
+A explicação deve ser uma única frase clara e informativa.
+Cada resumo deve ter exatamente uma linha com o título e a explicação.
+
+Responda APENAS com um array JSON, sem texto antes ou depois, com um objeto por segmento:
+[{"n": 1, "resumo": "Título do tópico: Explicação."}, {"n": 2, "resumo": "..."}]
+
+Exemplo exato do formato de um resumo:
+Curso Intensivo sobre Nietzsche: O curso foca em uma das obras mais significativas de Nietzsche, considerada por alguns como uma das maiores contribuições da humanidade."""
+
+# Resumo geral (map-reduce): tokens estimados por parte da transcrição e quantos resumos
+# parciais cada chamada de redução combina. Cada nível roda com uma chamada por parte (ou
+# grupo), até TLDV_MAX_WORKERS simultâneas; o ritmo real fica a cargo do limite de chat
+TLDV_PART_TOKENS = 3500
+TLDV_REDUCE_FANIN = 4
+TLDV_MAX_WORKERS = int(os.getenv("TLDV_MAX_WORKERS", "16"))
+
+# Agrupamento das legendas para o resumo: orçamento de tokens estimados por requisição e
+# duração mínima/máxima (segundos) de cada legenda do resumo
+SUMMARY_GROUP_TOKENS = int(os.getenv("SUMMARY_GROUP_TOKENS", "800"))
+SUMMARY_MIN_SPAN = 20
+SUMMARY_MAX_SPAN = 120
+
+# Paralelismo do resumo: grupos de legendas resumidos ao mesmo tempo (configurável via .env)
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+SUMMARY_RETRIES = int(os.getenv("SUMMARY_RETRIES", "3"))
+
+# Pool de conexões do cliente compartilhado da API (OpenRouter); tempos em segundos
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "16"))
+OPENAI_KEEPALIVE_EXPIRY = 60
+OPENAI_CONNECT_TIMEOUT = 10
+OPENAI_READ_TIMEOUT = 300  # um chunk de 25 MB pode levar minutos para ser transcrito
+OPENAI_POOL_TIMEOUT = 60
+
+LIVE_PREVIEW_LINES = 200  # últimas linhas exibidas enquanto a transcrição avança
+
+UPLOAD_SPOOL_BLOCK_SIZE = 8 * 1024 * 1024  # cópia do upload para o disco em blocos de 8 MB
+
+# Gravações longas: transcrição, resumos e PDFs são gerados em streaming direto para o disco
+LONG_FORM_SECONDS = int(os.getenv("LONG_FORM_HOURS", "3")) * 3600
+LONG_FORM_PREVIEW_LINES = 500  # linhas exibidas na tela; o conteúdo completo fica nos downloads
+
 # (Removido: configurações e cliente Vimeo, pois não serão usados)
 
 st.set_page_config(page_title="VidSynth", page_icon="🎥", layout="wide")
@@ -72,18 +147,40 @@ h1, h2, h3, p {
 </style>
 """, unsafe_allow_html=True)
 
+@process_singleton
+def get_connection_stats():
+    return ConnectionStats()
+
+@process_singleton
+def get_shared_openai_client(api_key):
+    """
+    Um único cliente por processo (e por chave), compartilhado por todas as sessões e
+    threads: o pool de conexões keep-alive evita um handshake TLS por sessão. O
+    cliente do SDK e o httpx por baixo dele podem ser usados de várias threads.
+    """
+    # Mesma classe Limits do httpx usada pelo SDK para os limites padrão
+    limits = type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+    http_client = DefaultHttpxClient(
+        limits=limits,
+        timeout=Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT, pool=OPENAI_POOL_TIMEOUT),
+        event_hooks={'request': [get_connection_stats().instrumenta]},
+    )
+    return OpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=api_key,
+        http_client=http_client,
+    )
+
 def get_openai_client():
-    if "openai_client" not in st.session_state:
-        api_key = st.secrets.get("OPENROUTER_API_KEY")
-        if api_key:
-            st.session_state.openai_client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=api_key
-            )
-        else:
-            st.error("Chave da API do OpenRouter não encontrada no secrets.toml.")
-            return None
-    return st.session_state.openai_client
+    api_key = st.secrets.get("OPENROUTER_API_KEY")
+    if not api_key:
+        st.error("Chave da API do OpenRouter não encontrada no secrets.toml.")
+        return None
+    return get_shared_openai_client(api_key)
 
 def validate_openai_api_key(api_key):
     # Validação desativada para compatibilidade com OpenRouter
@@ -147,6 +244,8 @@ def sidebar():
         )
 
         if st.button("Logout"):
+            release_video_spool()
+            release_documents()
             st.session_state["authentication_status"] = False
             st.session_state["openai_api_key"] = None
             st.session_state["username"] = None
@@ -158,21 +257,114 @@ def sidebar():
 
     return model, max_tokens, temperature
 
-@st.cache_data
-def transcreve_audio_chunk(chunk_path, prompt=""):
-    client = get_openai_client()
+@process_singleton
+def get_transcription_cache():
+    # Uma única instância por processo, compartilhada entre sessões e reruns
+    return DiskCache(CACHE_DIR / 'transcricoes', TRANSCRIPTION_CACHE_MAX_BYTES)
+
+@process_singleton
+def get_artifact_cache():
+    # Artefatos finais (SRTs e PDFs) indexados pela impressão digital do job
+    return DiskCache(CACHE_DIR / 'artefatos', ARTIFACT_CACHE_MAX_BYTES)
+
+@process_singleton
+def get_completion_cache():
+    # Respostas do LLM: regerar os documentos de um vídeo já resumido não vai à rede
+    return DiskCache(CACHE_DIR / 'completions', COMPLETION_CACHE_MAX_BYTES, ttl=COMPLETION_CACHE_TTL)
+
+@process_singleton
+def get_chat_stats():
+    return ChatStats()
+
+def chat_completion(client, model, messages, max_tokens, temperature, refresh=False):
+    """
+    Ponto único das chamadas de chat. A resposta é reaproveitada do cache em disco
+    quando modelo, mensagens, parâmetros e endpoint são os mesmos; com `refresh`,
+    o cache é ignorado na leitura e a nova resposta substitui a anterior.
+
+    A resposta chega em streaming e o tempo até o primeiro token de cada chamada é
+    registrado em get_chat_stats(). O texto final é a concatenação dos trechos,
+    idêntico ao da chamada sem streaming. A tela é atualizada por resumo completo
+    (on_summary em write_summary_files): os trechos chegam nas threads dos workers e,
+    nos lotes, são pedaços de um array JSON, sem nada legível para mostrar.
+    """
+    cache = get_completion_cache()
+    chave = job_fingerprint(model, json.dumps(messages, ensure_ascii=False, sort_keys=True),
+                            max_tokens, temperature, getattr(client, 'base_url', ''))
+    conteudo = None if refresh else cache.get_text(chave)
+    if conteudo is not None:
+        return conteudo
+
+    # Orçamento de tokens: entrada estimada localmente mais o máximo da resposta
+    tokens = sum(estimate_tokens(mensagem["content"]) for mensagem in messages) + max_tokens
+    get_rate_limiters()['chat'].acquire(units=tokens)
+
+    inicio = time.perf_counter()
+    ttft = None
+    partes = []
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        extra_headers={
+            "HTTP-Referer": "http://localhost",
+            "X-Title": "VidSynth"
+        }
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue  # Ex.: bloco final só com o uso de tokens
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if ttft is None:
+                ttft = time.perf_counter() - inicio
+            partes.append(delta)
+    duracao = time.perf_counter() - inicio
+    get_chat_stats().registra(ttft, duracao)
+    logger.info(f"Chat {model}: primeiro token em {f'{ttft:.2f}s' if ttft is not None else '-'}, "
+                f"total {duracao:.2f}s")
+    conteudo = "".join(partes)
+    if conteudo.strip():
+        # Resposta vazia não vai ao cache: a próxima chamada pede de novo à API
+        cache.set_text(chave, conteudo)
+    return conteudo
+
+@process_singleton
+def get_rate_limiters():
+    # Um orçamento por tipo de chamada, compartilhado por todas as sessões (e processos, com RATE_LIMIT_DB)
+    return {
+        'transcricao': create_rate_limiter('transcricao', TRANSCRIPTION_RPM, TRANSCRIPTION_AUDIO_SPM),
+        'chat': create_rate_limiter('chat', CHAT_RPM, CHAT_TPM),
+    }
+
+def transcreve_audio_chunk(chunk_path, prompt="", client=None, audio_seconds=0):
+    # Cache em disco pelo conteúdo do áudio e pelos parâmetros da transcrição
+    cache = get_transcription_cache()
+    model, language, response_format = TRANSCRIPTION_PARAMS
+    chave = transcription_cache_key(chunk_path, model=model, language=language,
+                                    response_format=response_format, prompt=prompt)
+    transcricao = cache.get_text(chave)
+    if transcricao is not None:
+        return transcricao
+
+    # O cliente pode ser passado explicitamente quando chamado fora da thread do Streamlit
+    client = client or get_openai_client()
     if not client:
         return None
 
+    get_rate_limiters()['transcricao'].acquire(units=audio_seconds)
     with open(chunk_path, 'rb') as arquivo_audio:
         transcricao = client.audio.transcriptions.create(
-            model='whisper-1',
-            language='pt',
-            response_format='srt',
+            model=model,
+            language=language,
+            response_format=response_format,
             file=arquivo_audio,
             prompt=prompt,
         )
-        return transcricao
+    cache.set_text(chave, transcricao)
+    return transcricao
 
 # Função para usar o modelo WhisperX
 # def transcribe_with_whisperx(video_path):
@@ -180,24 +372,41 @@ def transcreve_audio_chunk(chunk_path, prompt=""):
 #     result = transcribe(model, video_path, task="transcribe", language="pt")
 #     return result.text
 
-@st.cache_data
+def partes_alinhadas(transcricao, max_tokens):
+    """
+    Divide a transcrição em partes de até ~`max_tokens` estimados sem cortar legendas
+    nem palavras: um SRT é dividido entre legendas e um texto puro entre linhas.
+    """
+    transcript = Transcript.coerce(transcricao)
+    if not transcript and isinstance(transcricao, str):
+        transcript = Transcript(Segment(0, 0, linha) for linha in transcricao.splitlines() if linha.strip())
+    for grupo in iter_token_groups(transcript, max_tokens):
+        yield "\n".join(" ".join(seg.text.split()) for seg in grupo)
+
+def resumo_tldv_com_retry(client, model, max_tokens, temperature, conteudo, max_retries=SUMMARY_RETRIES):
+    def tenta(_tentativa):
+        return chat_completion(client, model, [
+            {"role": "system", "content": "Você é um assistente especializado em criar resumos concisos e informativos."},
+            {"role": "user", "content": conteudo}
+        ], max_tokens, temperature).strip()
+    return com_retry(tenta, "no resumo", max_retries)
+
 def gera_resumo_tldv(transcricao, model, max_tokens, temperature):
+    """
+    Resumo geral em map-reduce: partes alinhadas às legendas são resumidas em
+    paralelo (map) e os resumos parciais são combinados em uma árvore de chamadas,
+    também em paralelo (reduce), até restar um único resumo de até `max_tokens`.
+    Cada nível dispara todas as suas chamadas de uma vez (até TLDV_MAX_WORKERS), então,
+    enquanto as partes couberem nesse limite, a latência cresce com o número de níveis,
+    o logaritmo do tamanho da transcrição; acima dele, cada nível leva mais rodadas.
+    """
     client = get_openai_client()
     if not client:
         return None
 
-    try:
-        # Dividir a transcrição em partes menores se necessário
-        max_chars = 15000  # Ajuste este valor conforme necessário
-        transcricao_parts = [transcricao[i:i+max_chars] for i in range(0, len(transcricao), max_chars)]
-        
-        resumo_completo = ""
-        for part in transcricao_parts:
-            resposta = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em criar resumos concisos e informativos."},
-                    {"role": "user", "content": f"""Crie um resumo desta parte da transcrição, seguindo estas diretrizes:
+    def resume_parte(part):
+        # Map: cada parte da transcrição vira um resumo parcial
+        return resumo_tldv_com_retry(client, model, max_tokens, temperature, f"""Crie um resumo desta parte da transcrição, seguindo estas diretrizes:
                     1. Identifique os pontos principais do conteúdo sem repetições.
                     2. Escreva uma breve descrição para cada ponto importante.
                     3. Mantenha cada ponto conciso, mas informativo.
@@ -207,63 +416,188 @@ def gera_resumo_tldv(transcricao, model, max_tokens, temperature):
                     7. Verificar se o tempo da transcrição srt está compatível com o áudio do vídeo
 
                     Transcrição:
-                    {part}"""}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                extra_headers={
-                    "HTTP-Referer": "http://localhost",
-                    "X-Title": "VidSynth"
-                }
-            )
-            resumo_completo += resposta.choices[0].message.content + "\n\n"
+                    {part}""")
+
+    def combina(grupo):
+        # Reduce: um grupo de resumos parciais vira um só
+        if len(grupo) == 1:
+            return grupo[0]
+        return resumo_tldv_com_retry(client, model, max_tokens, temperature, f"""Combine estes resumos parciais, que estão em ordem cronológica, em um único resumo:
+                    1. Una pontos repetidos ou sobrepostos em um só.
+                    2. Mantenha a ordem cronológica e cubra todas as partes.
+                    3. Mantenha cada ponto conciso, mas informativo.
+                    4. Não inclua timestamps no resumo.
+
+                    Resumos parciais:
+                    {chr(10).join(grupo)}""")
+
+    def nivel(itens, consume):
+        # Uma chamada simultânea por item do nível, até o teto; resultados na ordem original
+        workers = max(1, min(len(itens), TLDV_MAX_WORKERS))
+        return list(run_pipeline_in_order(itens, consume, workers=workers, queue_size=2 * workers))
+
+    try:
+        # As partes são só texto (alguns KB cada): materializá-las permite dimensionar o map
+        resumos = nivel(list(partes_alinhadas(transcricao, TLDV_PART_TOKENS)), resume_parte)
+        while len(resumos) > 1:
+            resumos = nivel([resumos[i:i + TLDV_REDUCE_FANIN] for i in range(0, len(resumos), TLDV_REDUCE_FANIN)],
+                            combina)
         
-        return resumo_completo.strip()
+        return resumos[0] if resumos else ""
     except Exception as e:
         st.error(f"Erro ao gerar resumo: {str(e)}")
         return None
 
-def process_video(video_path_or_url):
-    temp_audio_file = None
+def transcreve_chunk_com_retry(client, chunk_path, start_time, end_time=None, max_retries=TRANSCRIPTION_RETRIES):
+    # Cada chunk é repetido de forma independente, sem afetar os demais
+    chunk_size = os.path.getsize(chunk_path)
+    logger.info(f"Processando chunk {os.path.basename(chunk_path)} ({chunk_size / (1024 * 1024):.2f} MB)")
+    audio_seconds = end_time - start_time if end_time is not None else 0
+    chunk_transcript = com_retry(
+        lambda _tentativa: transcreve_audio_chunk(chunk_path, client=client, audio_seconds=audio_seconds),
+        f"no chunk {os.path.basename(chunk_path)}", max_retries)
+    os.remove(chunk_path)  # Remove o chunk de áudio após a transcrição
+    # O SRT da API é analisado uma única vez; daqui em diante só circulam segmentos
+    return start_time, end_time, Transcript.from_srt(chunk_transcript)
+
+def transcribe_chunks(audio_chunks, client, workers=TRANSCRIPTION_WORKERS, stats=None):
+    """
+    Transcreve os chunks em paralelo e produz (início do chunk, fim do chunk, Transcript
+    no tempo do chunk) na ordem original, assim que cada chunk e todos os anteriores terminam.
+    `audio_chunks` pode ser um gerador: a transcrição começa assim que o primeiro
+    chunk fica pronto.
+    """
+    def consume(chunk):
+        return transcreve_chunk_com_retry(client, *chunk)
+    yield from run_pipeline_in_order(audio_chunks, consume, workers=max(1, workers),
+                                     queue_size=PIPELINE_QUEUE_SIZE, stats=stats)
+
+def transcript_job_key(video_hash):
+    # Impressão digital do job: conteúdo do vídeo + parâmetros da transcrição
+    return job_fingerprint(video_hash, *TRANSCRIPTION_PARAMS, AUDIO_PROFILE, VAD_MODE) if video_hash else None
+
+def is_long_form(media_info):
+    return bool(media_info and media_info.duration and media_info.duration >= LONG_FORM_SECONDS)
+
+def new_transcript_file():
+    fd, path = tempfile.mkstemp(prefix='vidsynth_transcricao_', suffix='.srt')
+    os.close(fd)
+    return path
+
+class LiveTranscriptView:
+    """
+    Acompanha a transcrição na tela: as legendas aparecem assim que o chunk delas
+    termina e a barra avança pelos segundos de áudio já processados. Só as últimas
+    linhas ficam visíveis, então cada atualização custa o mesmo em qualquer duração.
+    """
+
+    def __init__(self, total_seconds):
+        self.total_seconds = total_seconds or 0
+        self.barra = st.progress(0.0, text="Transcrevendo...")
+        self.area = st.empty()
+        self.linhas = deque(maxlen=LIVE_PREVIEW_LINES)
+
+    def add_segment(self, seg):
+        self.linhas.extend(iter_timestamped_lines([seg]))
+
+    def update(self, processed_seconds):
+        if self.total_seconds:
+            fracao = min(1.0, processed_seconds / self.total_seconds)
+            texto = (f"Transcrevendo... {datetime.timedelta(seconds=int(processed_seconds))} "
+                     f"de {datetime.timedelta(seconds=int(self.total_seconds))}")
+            espera = get_rate_limiters()['transcricao'].wait_time()
+            if espera >= 1:
+                texto += f" (fila da API: ~{espera:.0f}s)"
+            self.barra.progress(fracao, text=texto)
+        self.area.text("".join(self.linhas))
+
+    def finish(self):
+        self.barra.progress(1.0, text="Transcrição concluída")
+        self.area.empty()
+
+def process_video(video_path_or_url, timer=None, workers=TRANSCRIPTION_WORKERS, video_hash=None, media_info=None,
+                  on_segment=None, on_progress=None):
+    """
+    Devolve a transcrição do vídeo: um Transcript em memória ou, para gravações
+    longas, um TranscriptFile escrito incrementalmente em disco (quem o recebe
+    é responsável por removê-lo). `on_segment` recebe cada legenda já no tempo do
+    vídeo assim que ela é gravada, e `on_progress` os segundos do vídeo já
+    transcritos após cada chunk; o resultado final é o mesmo com ou sem eles.
+    """
+    timer = timer or StageTimer()
+    temp_dir = None
+    job_key = transcript_job_key(video_hash)
+    long_form = is_long_form(media_info)
+    srt_path = new_transcript_file() if long_form else None
     try:
-        # Criar um arquivo temporário para o áudio
-        temp_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_audio_file.close()
-        audio_path = temp_audio_file.name
+        # Vídeo já transcrito com os mesmos parâmetros: reaproveita o SRT
+        if long_form:
+            if load_artifact_files(get_artifact_cache(), job_key, {'transcricao.srt': srt_path}):
+                logger.info(f"Transcrição encontrada no cache para o vídeo {video_hash[:12]}")
+                transcript, srt_path = TranscriptFile(srt_path), None
+                return transcript
+        else:
+            artefatos = load_artifacts(get_artifact_cache(), job_key, ['transcricao.srt'])
+            if artefatos:
+                logger.info(f"Transcrição encontrada no cache para o vídeo {video_hash[:12]}")
+                return Transcript.from_srt(artefatos['transcricao.srt'].decode('utf-8'))
+
+        client = get_openai_client()
+        if not client:
+            return None
+
+        # Diretório temporário para os chunks de áudio
+        temp_dir = tempfile.mkdtemp(prefix='vidsynth_')
         
         logger.info(f"Iniciando processamento do vídeo: {video_path_or_url}")
-        logger.info(f"Arquivo de áudio temporário criado: {audio_path}")
-        
-        # Extrair áudio do vídeo
-        with VideoFileClip(video_path_or_url) as video:
-            audio = video.audio
-            audio.write_audiofile(audio_path)
-        
-        logger.info(f"Áudio extraído e salvo em: {audio_path}")
+        logger.info(f"Diretório temporário de áudio criado: {temp_dir}")
         
-        # Verificar se o arquivo de áudio foi criado corretamente
-        if not os.path.exists(audio_path):
-            raise FileNotFoundError(f"O arquivo de áudio não foi criado: {audio_path}")
-        
-        # Dividir o áudio em chunks
-        audio_chunks = split_audio(audio_path, chunk_duration=1200)  # 20 minutos por chunk
-        full_transcript = ""
-        
-        logger.info(f"Iniciando transcrição de {len(audio_chunks)} chunks de áudio")
-        
-        # Processar cada chunk de áudio
-        for i, (chunk_path, start_time) in enumerate(audio_chunks):
-            logger.info(f"Processando chunk {i+1}/{len(audio_chunks)}")
-            chunk_size = os.path.getsize(chunk_path)
-            logger.info(f"Tamanho do chunk: {chunk_size / (1024 * 1024):.2f} MB")
-            
-            chunk_transcript = transcreve_audio_chunk(chunk_path)
-            adjusted_transcript = ajusta_tempo_srt(chunk_transcript, start_time)
-            full_transcript += adjusted_transcript + "\n\n"
-            os.remove(chunk_path)  # Remove o chunk de áudio após a transcrição
+        # Metadados lidos uma única vez e repassados ao planejamento dos chunks
+        with timer.stage("leitura de metadados"):
+            media_info = media_info or probe_media(video_path_or_url)
+        if not long_form and is_long_form(media_info):
+            long_form = True
+            srt_path = new_transcript_file()
+
+        # Trechos sem fala não são enviados (nem cobrados); o mapa leva os tempos de volta ao vídeo
+        # (ver VAD_MODE: por padrão, só quando o áudio já seria recodificado)
+        with timer.stage("detecção de fala"):
+            offset_map, envelope = analyze_speech(video_path_or_url, media_info)
+
+        # Extrair o áudio em chunks (cortes alinhados às pausas da fala) enquanto os chunks
+        # já prontos são transcritos em paralelo; a fila limitada mantém o disco estável
+        logger.info(f"Iniciando extração e transcrição com {workers} workers")
+        stats = PipelineStats()
+        with timer.stage("extração e transcrição"):
+            audio_chunks = iter_audio_segments(video_path_or_url, temp_dir, workers=workers, align_silence=True,
+                                               media_info=media_info, offset_map=offset_map, envelope=envelope)
+            # Os chunks entram na junção em ordem, já deslocados e numerados globalmente;
+            # em gravações longas o SRT vai direto para o disco, sem cópia em memória
+            destino = open(srt_path, 'w', encoding='utf-8') if long_form else StringIO()
+            with destino:
+                merger = SrtMerger(destino, coleta=not long_form, ao_escrever=on_segment)
+                for start_time, end_time, chunk_transcript in transcribe_chunks(audio_chunks, client, workers=workers,
+                                                                                stats=stats):
+                    merger.add_chunk(chunk_transcript, start_time, offset_map)
+                    if on_progress:
+                        on_progress(offset_map.to_original(end_time, fim=True) if offset_map else end_time)
+                merger.close()
+                if on_progress:
+                    on_progress(media_info.duration or 0)
+                if not long_form:
+                    srt_bytes = destino.getvalue().encode('utf-8')
+        timer.detalhes["pipeline"] = stats.resumo()
+        timer.detalhes["cache de transcrição"] = get_transcription_cache().resumo()
+        timer.detalhes["conexões"] = get_connection_stats().resumo()
+        timer.detalhes["limite de transcrição"] = get_rate_limiters()['transcricao'].resumo()
         
-        logger.info("Transcrição completa")
-        return full_transcript
+        logger.info(f"Transcrição completa: {merger.count} legendas ({timer.resumo()})")
+        if long_form:
+            store_artifact_files(get_artifact_cache(), job_key, {'transcricao.srt': srt_path})
+            transcript, srt_path = TranscriptFile(srt_path, merger.count), None
+            return transcript
+        store_artifacts(get_artifact_cache(), job_key, {'transcricao.srt': srt_bytes})
+        return merger.transcript
     
     except Exception as e:
         logger.exception(f"Erro ao processar o vídeo: {str(e)}")
@@ -271,13 +605,15 @@ def process_video(video_path_or_url):
     
     finally:
         logger.info("Iniciando limpeza de recursos")
-        # Limpeza dos arquivos temporários
-        if temp_audio_file and os.path.exists(temp_audio_file.name):
+        # Limpeza dos arquivos temporários (o SRT longo só sobrevive se foi devolvido)
+        if srt_path and os.path.exists(srt_path):
+            os.remove(srt_path)
+        if temp_dir and os.path.exists(temp_dir):
             try:
-                os.remove(temp_audio_file.name)
-                logger.info(f"Arquivo de áudio temporário removido: {temp_audio_file.name}")
+                shutil.rmtree(temp_dir)
+                logger.info(f"Diretório de áudio temporário removido: {temp_dir}")
             except Exception as e:
-                logger.warning(f"Não foi possível remover o arquivo de áudio temporário: {str(e)}")
+                logger.warning(f"Não foi possível remover o diretório de áudio temporário: {str(e)}")
 
 ########################################
 #FUNÇÕES DE TRANSCRIÇÃO DE VIDEO DO VIMEO
@@ -294,168 +630,362 @@ def process_video(video_path_or_url):
 ########################################
 #FUNÇÕES DE PROCESSO DE TRANSCRIÇÃO EM SRT E PDF
 ########################################  
-def generate_summarized_srt_from_full(srt_content, client, model):
-    """
-    Generate a summarized SRT that maintains timing but provides concise summaries
-    of key points with topic and explanation format.
-    """
-    segments = []
-    current_segment = {}
-    current_text = []
-    
-    # Parse original SRT content
-    for line in srt_content.strip().split('\n'):
-        line = line.strip()
-        if line.isdigit():  # Segment number
-            if current_segment:
-                current_segment['text'] = ' '.join(current_text)
-                segments.append(current_segment)
-                current_segment = {}
-                current_text = []
-        elif '-->' in line:  # Timestamp
-            start, end = line.split(' --> ')
-            current_segment['start_time'] = start.strip()
-            current_segment['end_time'] = end.strip()
-        elif line:  # Content
-            current_text.append(line)
+class ResumoInvalido(ValueError):
+    """Resposta do modelo fora do formato esperado; vale uma nova tentativa sem o cache."""
+
+    def __init__(self, mensagem, resposta=""):
+        super().__init__(mensagem)
+        self.resposta = resposta
+
+def resume_grupo(client, model, chunk, refresh=False):
+    """Resume um grupo de legendas numa única linha "Título: explicação" com o tempo do grupo."""
+    # Combine text from segments in chunk
+    chunk_text = " ".join(" ".join(seg.text.split()) for seg in chunk)
     
-    # Add last segment if exists
-    if current_segment and current_text:
-        current_segment['text'] = ' '.join(current_text)
-        segments.append(current_segment)
+    # Generate summary using OpenAI with specific format prompt
+    summary = chat_completion(client, model, [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user",
+        "content": f"Resuma este segmento no formato especificado: {chunk_text}"}
+    ], SUMMARY_MAX_TOKENS, SUMMARY_TEMPERATURE, refresh=refresh).strip()
+    resumo = valida_resumo(summary)
+    if not resumo:
+        raise ResumoInvalido(f"resumo fora do formato: {summary[:80]!r}", summary)
     
-    # Group segments into meaningful chunks
-    chunk_size = 3  # Adjust based on your needs
-    chunks = [segments[i:i + chunk_size] 
-             for i in range(0, len(segments), chunk_size)]
+    # Create new segment with summary
+    return Segment(chunk[0].start_ms, chunk[-1].end_ms, resumo)
+
+def resume_grupo_com_retry(client, model, chunk, max_retries=SUMMARY_RETRIES):
+    # Cada grupo é repetido de forma independente: uma falha não descarta os demais resumos.
+    # Uma resposta malformada pode estar no cache: as tentativas seguintes pedem de novo à API
+    descricao = f"ao resumir o trecho de {formata_tempo_srt(chunk[0].start_ms)}"
+    try:
+        return com_retry(lambda tentativa: resume_grupo(client, model, chunk, refresh=tentativa > 1),
+                         descricao, max_retries)
+    except ResumoInvalido as e:
+        if not e.resposta:
+            raise
+        # Esgotadas as tentativas, fica a última resposta não vazia em vez de perder o trecho
+        logger.warning(f"Resumo fora do formato mantido {descricao}: {e.resposta[:80]!r}")
+        return Segment(chunk[0].start_ms, chunk[-1].end_ms, " ".join(e.resposta.split()).replace('*', ''))
+
+def valida_resumo(resumo):
+    """Devolve o resumo normalizado se ele estiver no formato "Título: explicação" em uma linha, senão None."""
+    if not isinstance(resumo, str):
+        return None
+    resumo = " ".join(resumo.split()).replace('*', '')
+    titulo, separador, explicacao = resumo.partition(':')
+    if not separador or not titulo.strip() or not explicacao.strip():
+        return None
+    return resumo
+
+def extrai_resumos_json(conteudo, total):
+    """Lê o array JSON da resposta em lote e devolve {posição: resumo} só com os itens válidos."""
+    inicio, fim = conteudo.find('['), conteudo.rfind(']')
+    if inicio < 0 or fim < inicio:
+        return {}
+    try:
+        itens = json.loads(conteudo[inicio:fim + 1])
+    except ValueError:
+        return {}
+    resumos = {}
+    for item in itens if isinstance(itens, list) else []:
+        if not isinstance(item, dict) or not isinstance(item.get('n'), int):
+            continue
+        posicao = item['n'] - 1
+        resumo = valida_resumo(item.get('resumo'))
+        if 0 <= posicao < total and resumo and posicao not in resumos:
+            resumos[posicao] = resumo
+    return resumos
+
+def resume_lote(client, model, lote, refresh=False):
+    """Resume vários grupos numa única requisição. Devolve {posição no lote: resumo} dos itens válidos."""
+    segmentos = "\n\n".join(f"[{n}] " + " ".join(" ".join(seg.text.split()) for seg in chunk)
+                             for n, chunk in enumerate(lote, start=1))
+    conteudo = chat_completion(client, model, [
+        {"role": "system", "content": SUMMARY_BATCH_SYSTEM_PROMPT},
+        {"role": "user",
+        "content": f"Resuma cada um destes {len(lote)} segmentos no formato especificado:\n\n{segmentos}"}
+    ], SUMMARY_MAX_TOKENS * len(lote), SUMMARY_TEMPERATURE, refresh=refresh)
+    return extrai_resumos_json(conteudo, len(lote))
+
+def resume_lote_com_retry(client, model, lote, max_retries=SUMMARY_RETRIES):
+    """
+    Resume um lote de grupos e devolve um Segment por grupo, na ordem do lote. Só os
+    itens ausentes ou malformados na resposta são pedidos de novo; o que continuar
+    faltando após as tentativas é resumido individualmente.
+    """
+    resumos = {}
+    pendentes = list(range(len(lote)))
+    refresh = False
+
+    def tenta(_tentativa):
+        nonlocal pendentes, refresh
+        obtidos = resume_lote(client, model, [lote[i] for i in pendentes], refresh=refresh)
+        for posicao, resumo in obtidos.items():
+            resumos[pendentes[posicao]] = resumo
+        # Sem nenhum item válido, o mesmo pedido se repetiria: a próxima tentativa ignora o cache
+        refresh = not obtidos
+        pendentes = [i for i in pendentes if i not in resumos]
+        if pendentes:
+            raise ResumoInvalido(f"{len(pendentes)} de {len(lote)} resumos ausentes ou malformados")
+
+    try:
+        com_retry(tenta, f"ao resumir o lote de {formata_tempo_srt(lote[0][0].start_ms)}", max_retries)
+    except ResumoInvalido:
+        pass  # Os que continuam faltando são resumidos um a um abaixo
+    for i in pendentes:
+        resumos[i] = resume_grupo_com_retry(client, model, lote[i]).text
+    return [Segment(chunk[0].start_ms, chunk[-1].end_ms, resumos[i]) for i, chunk in enumerate(lote)]
+
+def iter_batches(grupos, tamanho):
+    iterador = iter(grupos)
+    while True:
+        lote = list(itertools.islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+def iter_summarized_segments(transcript, client, model, workers=SUMMARY_WORKERS, batch_groups=SUMMARY_BATCH_GROUPS):
+    """
+    Generate concise summaries of key points with topic and explanation format,
+    keeping the timing of the original segments. Yields one Segment per group, in
+    timestamp order, while up to `workers` requests run concurrently. With
+    `batch_groups` > 1 each request summarizes that many groups at once.
+    """
+    # Group segments into meaningful chunks: por orçamento de tokens, não por contagem fixa
+    chunks = iter_token_groups(Transcript.coerce(transcript), SUMMARY_GROUP_TOKENS,
+                               min_span_ms=SUMMARY_MIN_SPAN * 1000, max_span_ms=SUMMARY_MAX_SPAN * 1000)
     
     # Generate summaries for each chunk
-    summarized_segments = []
-    for chunk in chunks:
-        # Combine text from segments in chunk
-        chunk_text = " ".join(seg['text'] for seg in chunk)
-        
-        # Generate summary using OpenAI with specific format prompt
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system",
-                "content": """Você é um especialista em criar resumos estruturados em português do Brasil.
-                Para cada segmento, forneça um resumo EXATAMENTE neste formato:
-        
-                Título do tópico: Explicação concisa e direta do conteúdo.
-        
-                O título deve ser curto e direto, seguido de dois pontos.
-                A explicação deve ser uma única frase clara e informativa.
-                Cada resumo deve ter exatamente uma linha com o título e a explicação.
-                
-                Exemplo exato do formato:
-                Curso Intensivo sobre Nietzsche: O curso foca em uma das obras mais significativas de Nietzsche, considerada por alguns como uma das maiores contribuições da humanidade."""},
-                {"role": "user",
-                "content": f"Resuma este segmento no formato especificado: {chunk_text}"}
-            ],
-            max_tokens=150,
-            temperature=0.4,
-            extra_headers={
-                "HTTP-Referer": "http://localhost",
-                "X-Title": "VidSynth"
-            }
-        )
-        
-        summary = response.choices[0].message.content.strip()
-        
-        # Create new segment with summary
-        summarized_segments.append({
-            'start_time': chunk[0]['start_time'],
-            'end_time': chunk[-1]['end_time'],
-            'text': summary
-        })
-    
-    # Convert summarized segments back to SRT format
-    srt_output = ""
-    for i, segment in enumerate(summarized_segments, 1):
-        srt_output += f"{i}\n"
-        srt_output += f"{segment['start_time']} --> {segment['end_time']}\n"
-        srt_output += f"{segment['text']}\n\n"
-    
-    # Para a versão sem timestamps, criar uma versão separada com linhas em branco entre os segmentos
-    text_only_output = "\n\n".join(segment['text'] for segment in summarized_segments)
-    
-    return srt_output, text_only_output
+    workers = max(1, workers)
+    def resume_um(chunk):
+        return resume_grupo_com_retry(client, model, chunk)
+
+    def resume_varios(lote):
+        return resume_lote_com_retry(client, model, lote)
+
+    if batch_groups <= 1:
+        yield from run_pipeline_in_order(chunks, resume_um, workers=workers, queue_size=2 * workers)
+        return
+    for segmentos in run_pipeline_in_order(iter_batches(chunks, batch_groups), resume_varios,
+                                           workers=workers, queue_size=2 * workers):
+        yield from segmentos
+
+def write_summary_files(transcript, client, model, destinos, on_summary=None):
+    """
+    Gera o resumo em streaming: cada segmento resumido é gravado no SRT e no texto
+    assim que fica pronto (e repassado a `on_summary`, na thread do script), e o
+    PDF é montado relendo o SRT do disco.
+    """
+    with open(destinos['resumo.srt'], 'w', encoding='utf-8') as srt_file, \
+            open(destinos['resumo.txt'], 'w', encoding='utf-8') as txt_file:
+        for i, segment in enumerate(iter_summarized_segments(transcript, client, model), start=1):
+            srt_file.write(formata_segmento_srt(i, segment))
+            # Versão sem timestamps: linhas em branco entre os segmentos
+            txt_file.write(("\n\n" if i > 1 else "") + segment.text)
+            if on_summary:
+                on_summary(segment)
+    create_pdf_file((seg.text for seg in TranscriptFile(destinos['resumo.srt'])), destinos['resumo.pdf'])
+    return destinos
+
+def read_preview(path, max_linhas=None):
+    with open(path, encoding='utf-8') as f:
+        return "".join(itertools.islice(f, max_linhas))
 
-def process_transcription(srt_content, model, max_tokens, temperature, video_path):
+def process_transcription(srt_content, model, max_tokens, temperature, video_path, video_hash=None, media_info=None):
     client = get_openai_client()
     if not client:
         return
 
+    # Todas as saídas abaixo saem dos mesmos segmentos, sem reanalisar o SRT; em
+    # gravações longas eles são relidos do disco em streaming a cada passada
+    transcript = Transcript.coerce(srt_content)
+    long_form = isinstance(transcript, TranscriptFile)
+    preview_lines = LONG_FORM_PREVIEW_LINES if long_form else None
+
     # Status placeholder para mensagens de progresso
     status_placeholder = st.empty()
     status_placeholder.success("Transcrição automática concluída! Gerando documentos...")
 
-    # Generate summarized SRT and text-only version
-    status_placeholder.info("Gerando resumo da transcrição...")
-    summarized_srt, text_only_summary = generate_summarized_srt_from_full(srt_content, client, model)
-    
-    # Get video duration
-    with VideoFileClip(video_path) as video:
-        duracao_total_segundos = int(video.duration)
-
-    # Create PDFs and SRTs
-    status_placeholder.info("Gerando arquivos PDF e SRT...")
-    transcript_pdf = create_pdf(processa_srt_sem_timestamp(srt_content), "transcricao_completa.pdf")
-    summarized_pdf = create_pdf(text_only_summary, "transcricao_resumida.pdf")
-    
-    # Save SRT files
-    summarized_srt_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.srt', encoding='utf-8')
-    summarized_srt_file.write(summarized_srt)
-    summarized_srt_file.close()
-    
-    transcript_srt_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.srt', encoding='utf-8')
-    transcript_srt_file.write(srt_content)
-    transcript_srt_file.close()
+    # Todos os documentos são gerados direto em arquivos, sem montar cópias em memória;
+    # os do processamento anterior desta sessão deixam de ser oferecidos
+    release_documents()
+    docs = SessionDocuments(sob_demanda=long_form)
+    work_dir = docs.directory
+    try:
+        # Cada grupo de artefatos é indexado só pelos parâmetros que o afetam: mudar o modelo
+        # de resumo invalida o resumo, mas não o PDF da transcrição completa
+        cache = get_artifact_cache()
+        transcript_key = transcript_job_key(video_hash)
+        summary_key = (job_fingerprint(transcript_key, model, SUMMARY_MAX_TOKENS, SUMMARY_TEMPERATURE,
+                                       SUMMARY_GROUP_TOKENS, SUMMARY_MIN_SPAN, SUMMARY_MAX_SPAN, SUMMARY_BATCH_GROUPS)
+                       if transcript_key else None)
 
-    # Remover mensagem de status
-    status_placeholder.empty()
-    
-    # Mostrar mensagem final de sucesso
-    st.success("Processamento completo! Todos os arquivos foram gerados.")
+        resumo = {
+            'resumo.srt': os.path.join(work_dir, 'transcricao_resumida.srt'),
+            'resumo.txt': os.path.join(work_dir, 'transcricao_resumida.txt'),
+            'resumo.pdf': os.path.join(work_dir, 'transcricao_resumida.pdf'),
+        }
+        if not load_artifact_files(cache, summary_key, resumo):
+            # Generate summarized SRT and text-only version
+            status_placeholder.info("Gerando resumo da transcrição...")
+            # Os resumos aparecem na tela em ordem, assim que cada um chega
+            previa = st.empty()
+            linhas = deque(maxlen=LIVE_PREVIEW_LINES)
+            def mostra_resumo(segment):
+                linhas.append(f"{formata_tempo_srt(segment.start_ms)[:8]} - {segment.text}\n")
+                with previa.container():
+                    st.caption("Transcrição Resumida (em andamento)")
+                    st.text("".join(linhas))
+            write_summary_files(transcript, client, model, resumo, on_summary=mostra_resumo)
+            previa.empty()
+            store_artifact_files(cache, summary_key, resumo)
+        
+        # Create PDFs and SRTs
+        completa = {'transcricao.pdf': os.path.join(work_dir, 'transcricao_completa.pdf')}
+        if not load_artifact_files(cache, transcript_key, completa):
+            status_placeholder.info("Gerando arquivos PDF e SRT...")
+            create_pdf_file(iter_paragraphs(transcript.iter_text()), completa['transcricao.pdf'])
+            store_artifact_files(cache, transcript_key, completa)
+        
+        logger.info(f"Cache de respostas do LLM: {get_completion_cache().resumo()}")
+        logger.info(f"Chamadas de chat: {get_chat_stats().resumo()}")
+        logger.info(f"Conexões com a API: {get_connection_stats().resumo()}")
+        logger.info(f"Limite de chat: {get_rate_limiters()['chat'].resumo()}")
+        transcript_srt_path = transcript.write_srt(os.path.join(work_dir, 'transcricao_completa.srt'))
+
+        # Remover mensagem de status
+        status_placeholder.empty()
+        
+        # Mostrar mensagem final de sucesso
+        media_info = media_info or probe_media(video_path)
+        duracao = str(datetime.timedelta(seconds=int(media_info.duration or 0)))
+        st.success(f"Processamento completo! Todos os arquivos foram gerados (vídeo de {duracao}).")
+        if long_form:
+            st.info(f"Gravação longa: a tela mostra as primeiras {LONG_FORM_PREVIEW_LINES} linhas; "
+                    "o conteúdo completo está nos arquivos para download.")
 
-    # Create tabs for display
-    tab1, tab2 = st.tabs([
-        "Transcrição Resumida",
-        "Transcrição Completa"
-    ])
+        # Create tabs for display
+        tab1, tab2 = st.tabs([
+            "Transcrição Resumida",
+            "Transcrição Completa"
+        ])
 
-    with tab1:
-        st.text_area("Transcrição Resumida", text_only_summary, height=300)
+        with tab1:
+            st.text_area("Transcrição Resumida", read_preview(resumo['resumo.txt'], preview_lines), height=300)
 
-    with tab2:
-        st.text_area("Transcrição Completa", processa_srt(srt_content), height=300)
+        with tab2:
+            st.text_area("Transcrição Completa",
+                         "".join(itertools.islice(transcript.iter_timestamped_text(), preview_lines)), height=300)
+
+        # Os downloads ficam na sessão: clicar em um botão reexecuta o script
+        docs.downloads = {
+            "Transcrição Resumida": [
+                ("Baixar Transcrição Resumida (PDF)", resumo['resumo.pdf'], "application/pdf"),
+                ("Baixar Transcrição Resumida (SRT)", resumo['resumo.srt'], "text/plain"),
+            ],
+            "Transcrição Completa": [
+                ("Baixar Transcrição Completa (PDF)", completa['transcricao.pdf'], "application/pdf"),
+                ("Baixar Transcrição Completa (SRT)", transcript_srt_path, "text/plain"),
+            ],
+        }
+        st.session_state["documentos"] = docs
+
+    except Exception:
+        docs.release()
+        raise
+
+    finally:
+        # O SRT de uma gravação longa pertence a este job; os documentos ficam com a sessão
+        if long_form:
+            transcript.remove()
+
+def show_downloads():
+    """
+    Botões de download dos documentos do último processamento da sessão. O arquivo é
+    entregue ao st.download_button aberto, sem cópia em base64 na página.
 
-    # Download section
+    O st.download_button lê o arquivo inteiro para a memória a cada rerun. Em gravações
+    longas (docs.sob_demanda) cada documento ganha antes um botão "Preparar", e só o
+    escolhido vira botão de download: um arquivo por vez na memória, não os quatro.
+    """
+    docs = st.session_state.get("documentos")
+    if not docs:
+        return
     st.subheader("Download dos Arquivos")
-    tab1, tab2 = st.tabs(["Transcrição Resumida", "Transcrição Completa"])
-    
-    with tab1:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(create_download_link_pdf(summarized_pdf, "Baixar Transcrição Resumida (PDF)", "transcricao_resumida.pdf"), unsafe_allow_html=True)
-        with col2:
-            st.markdown(create_download_link(summarized_srt_file.name, "Baixar Transcrição Resumida (SRT)"), unsafe_allow_html=True)
-            
-    with tab2:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(create_download_link_pdf(transcript_pdf, "Baixar Transcrição Completa (PDF)", "transcricao_completa.pdf"), unsafe_allow_html=True)
-        with col2:
-            st.markdown(create_download_link(transcript_srt_file.name, "Baixar Transcrição Completa (SRT)"), unsafe_allow_html=True)
-
-    # Cleanup temporary files
-    for file in [summarized_srt_file.name, transcript_srt_file.name]:
-        try:
-            os.remove(file)
-        except Exception as e:
-            logger.warning(f"Não foi possível remover o arquivo temporário {file}: {str(e)}")
+    for aba, arquivos in zip(st.tabs(list(docs.downloads)), docs.downloads.values()):
+        with aba:
+            for coluna, (rotulo, path, mime) in zip(st.columns(len(arquivos)), arquivos):
+                if not os.path.exists(path):
+                    continue
+                with coluna:
+                    if docs.sob_demanda and path != docs.escolhido:
+                        tamanho = os.path.getsize(path) / (1024 * 1024)
+                        st.button(f"Preparar: {rotulo} ({tamanho:.1f} MB)", key=f"preparar-{path}",
+                                  on_click=escolhe_download, args=(docs, path))
+                        continue
+                    with open(path, 'rb') as f:
+                        st.download_button(rotulo, f, file_name=os.path.basename(path), mime=mime)
+
+def escolhe_download(docs, path):
+    # Callback: roda antes do rerun, então só o arquivo escolhido é lido na renderização
+    docs.escolhido = path
+
+def release_documents():
+    docs = st.session_state.pop("documentos", None)
+    if docs:
+        docs.release()
+
+def spool_upload(uploaded_file, fonte="Upload Local"):
+    """
+    Grava o upload em disco uma única vez por arquivo (identificado pelo file_id do
+    uploader), em blocos de tamanho fixo, e reaproveita o arquivo nos reruns seguintes.
+    Retorna (caminho, sha256).
+    """
+    spool = st.session_state.get("video_spool")
+    if spool and spool.matches(uploaded_file.file_id):
+        return spool.path, spool.sha256
+
+    # Novo arquivo no uploader: libera o anterior antes de gravar o próximo
+    release_video_spool()
+    sweep_stale_spools()
+    uploaded_file.seek(0)
+    spool = VideoSpool(fonte, uploaded_file.file_id, suffix=Path(uploaded_file.name).suffix or '.mp4')
+    with open(spool.path, 'wb') as f:
+        # A impressão digital do vídeo é calculada enquanto o upload é gravado em disco
+        spool.sha256 = copy_and_hash(uploaded_file, f, block_size=UPLOAD_SPOOL_BLOCK_SIZE)
+    st.session_state["video_spool"] = spool
+    logger.info(f"Upload gravado em {spool.path} ({uploaded_file.size / (1024 * 1024):.2f} MB)")
+    return spool.path, spool.sha256
+
+def spool_remote(url, fonte):
+    """
+    Baixa o vídeo remoto uma única vez por URL com requisições em paralelo; todas as
+    etapas seguintes (e os reruns) usam a cópia local. Retorna (caminho, sha256).
+    """
+    spool = st.session_state.get("video_spool")
+    if spool and spool.matches(url):
+        return spool.path, spool.sha256
+
+    release_video_spool()
+    sweep_stale_spools()
+    spool = VideoSpool(fonte, url, suffix=Path(url.split('?')[0]).suffix or '.mp4')
+    try:
+        spool.sha256 = download_to_spool(url, spool.path)
+    except Exception:
+        spool.release()
+        raise
+    st.session_state["video_spool"] = spool
+    return spool.path, spool.sha256
+
+def release_video_spool(fonte=None):
+    # Sem `fonte`, libera sempre; com `fonte`, só se o arquivo gravado for de outra fonte
+    spool = st.session_state.get("video_spool")
+    if not spool or spool.fonte == fonte:
+        return
+    del st.session_state["video_spool"]
+    spool.release()
 
 def page(model, max_tokens, temperature):
     st.title("Resumo de Transcrição de Vídeo")
@@ -464,32 +994,40 @@ def page(model, max_tokens, temperature):
         st.session_state.session_id = hashlib.md5(str(datetime.datetime.now()).encode()).hexdigest()
 
     video_source = st.radio("Escolha a fonte do vídeo:", ["Upload Local", "Google Cloud Storage", "Amazon S3"])
+    release_video_spool(fonte=video_source)
 
     if video_source == "Upload Local":
-        uploaded_video = st.file_uploader("Faça upload do vídeo", type=['mp4', 'avi', 'mov'])
+        uploaded_video = st.file_uploader("Faça upload do vídeo ou áudio",
+                                          type=['mp4', 'avi', 'mov', 'mp3', 'm4a', 'wav', 'ogg', 'opus'])
         if uploaded_video:
             file_size = uploaded_video.size
             st.write(f"Tamanho do arquivo: {file_size / (1024 * 1024):.2f} MB")
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-                temp_file.write(uploaded_video.read())
-                temp_file_path = temp_file.name
+            # Reaproveitado entre reruns: mexer na sidebar não copia o vídeo de novo
+            temp_file_path, video_hash = spool_upload(uploaded_video)
 
             if st.button("Transcrever vídeo automaticamente"):
                 st.info("Transcrevendo o vídeo automaticamente... Isso pode levar alguns minutos.")
+                timer = StageTimer()
                 try:
-                    srt_content = process_video(temp_file_path)
-                    if srt_content:
+                    media_info = probe_media(temp_file_path)
+                    view = LiveTranscriptView(media_info.duration)
+                    transcript = process_video(temp_file_path, timer, video_hash=video_hash, media_info=media_info,
+                                               on_segment=view.add_segment, on_progress=view.update)
+                    view.finish()
+                    if transcript:
                         st.success("Transcrição automática concluída!")
-                        process_transcription(srt_content, model, max_tokens, temperature, temp_file_path)
+                        process_transcription(transcript, model, max_tokens, temperature, temp_file_path,
+                                              video_hash=video_hash, media_info=media_info)
+                        st.caption(f"Tempo por etapa: {timer.resumo()}")
                     else:
                         st.error("Não foi possível realizar a transcrição automática.")
                 except Exception as e:
                     st.error(f"Erro durante a transcrição: {str(e)}")
                     logger.exception("Erro durante a transcrição do vídeo")
-                finally:
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
+        else:
+            # Uploader vazio: o arquivo gravado não é mais necessário
+            release_video_spool()
 
     elif video_source == "Google Cloud Storage":
         gcs_video_url = st.text_input("Digite a URL pública do vídeo no Google Cloud Storage")
@@ -498,13 +1036,22 @@ def page(model, max_tokens, temperature):
             
             if st.button("Transcrever vídeo do GCS"):
                 st.info("Transcrevendo o vídeo do GCS... Isso pode levar alguns minutos.")
+                timer = StageTimer()
                 try:
-                    with st.spinner("Realizando transcrição..."):
-                        srt_content = process_video(gcs_video_url)
+                    # Baixa uma única vez com conexões em paralelo; as etapas seguintes leem a cópia local
+                    with st.spinner("Baixando vídeo..."), timer.stage("download"):
+                        video_path, video_hash = spool_remote(gcs_video_url, "Google Cloud Storage")
+                    media_info = probe_media(video_path)
+                    view = LiveTranscriptView(media_info.duration)
+                    transcript = process_video(video_path, timer, video_hash=video_hash, media_info=media_info,
+                                               on_segment=view.add_segment, on_progress=view.update)
+                    view.finish()
                     
-                    if srt_content:
+                    if transcript:
                         st.success("Transcrição automática concluída!")
-                        process_transcription(srt_content, model, max_tokens, temperature, gcs_video_url)
+                        process_transcription(transcript, model, max_tokens, temperature, video_path,
+                                              video_hash=video_hash, media_info=media_info)
+                        st.caption(f"Tempo por etapa: {timer.resumo()}")
                     else:
                         st.error("Não foi possível realizar a transcrição automática.")
                 except Exception as e:
@@ -518,19 +1065,31 @@ def page(model, max_tokens, temperature):
             
             if st.button("Transcrever vídeo do S3"):
                 st.info("Transcrevendo o vídeo do S3... Isso pode levar alguns minutos.")
+                timer = StageTimer()
                 try:
-                    with st.spinner("Realizando transcrição..."):
-                        srt_content = process_video(s3_video_url)
+                    # Baixa uma única vez com conexões em paralelo; as etapas seguintes leem a cópia local
+                    with st.spinner("Baixando vídeo..."), timer.stage("download"):
+                        video_path, video_hash = spool_remote(s3_video_url, "Amazon S3")
+                    media_info = probe_media(video_path)
+                    view = LiveTranscriptView(media_info.duration)
+                    transcript = process_video(video_path, timer, video_hash=video_hash, media_info=media_info,
+                                               on_segment=view.add_segment, on_progress=view.update)
+                    view.finish()
                     
-                    if srt_content:
+                    if transcript:
                         st.success("Transcrição automática concluída!")
-                        process_transcription(srt_content, model, max_tokens, temperature, s3_video_url)
+                        process_transcription(transcript, model, max_tokens, temperature, video_path,
+                                              video_hash=video_hash, media_info=media_info)
+                        st.caption(f"Tempo por etapa: {timer.resumo()}")
                     else:
                         st.error("Não foi possível realizar a transcrição automática.")
                 except Exception as e:
                     st.error(f"Erro durante a transcrição: {str(e)}")
                     logger.exception("Erro durante a transcrição do vídeo")
 
+    # Downloads do último processamento, mantidos entre reruns
+    show_downloads()
+
     # Adicionar JavaScript para controle do vídeo
     st.markdown("""
     <script>
@@ -0,0 +1,91 @@
+"""
+Compara os perfis de codificação de áudio (AUDIO_PROFILES) em um arquivo real:
+número de chunks, bytes enviados à API e tempo de extração. Os chunks são gerados
+como no app (iter_audio_segments com cortes nas pausas e, conforme VAD_ENABLED, sem
+os trechos sem fala; a detecção de fala entra no tempo de extração). Com --transcrever, também mede o tempo de ponta a ponta
+incluindo a transcrição.
+
+Uso:
+    python benchmark_profiles.py video.mp4
+    python benchmark_profiles.py video.mp4 --transcrever --workers 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv, find_dotenv
+from openai import OpenAI
+
+from utils import AUDIO_PROFILES, TRANSCRIPTION_PARAMS, analyze_speech, iter_audio_segments, probe_media
+
+
+def transcreve(client, chunk_path):
+    model, language, response_format = TRANSCRIPTION_PARAMS
+    with open(chunk_path, 'rb') as arquivo_audio:
+        return client.audio.transcriptions.create(
+            model=model,
+            language=language,
+            response_format=response_format,
+            file=arquivo_audio,
+        )
+
+
+def mede_perfil(source, profile, workers, info, client=None):
+    temp_dir = tempfile.mkdtemp(prefix='vidsynth_bench_')
+    try:
+        inicio = time.perf_counter()
+        # Depende do perfil: no modo "auto", trilhas copiadas sem recodificação não passam pelo VAD
+        offset_map, envelope = analyze_speech(source, info, profile)
+        chunks = list(iter_audio_segments(source, temp_dir, profile=profile, workers=workers, align_silence=True,
+                                          media_info=info, offset_map=offset_map, envelope=envelope))
+        extracao = time.perf_counter() - inicio
+        total_bytes = sum(os.path.getsize(chunk_path) for chunk_path, _start, _end in chunks)
+
+        transcricao = None
+        if client:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda chunk: transcreve(client, chunk[0]), chunks))
+            transcricao = time.perf_counter() - inicio - extracao
+
+        return {
+            'perfil': profile,
+            'chunks': len(chunks),
+            'mb': total_bytes / (1024 * 1024),
+            'extracao': extracao,
+            'transcricao': transcricao,
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis de codificação de áudio")
+    parser.add_argument('source', help="Arquivo de vídeo ou áudio")
+    parser.add_argument('--perfis', nargs='+', default=list(AUDIO_PROFILES), choices=list(AUDIO_PROFILES))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--transcrever', action='store_true',
+                        help="Também envia os chunks à API (usa OPENROUTER_API_KEY)")
+    args = parser.parse_args()
+
+    client = None
+    if args.transcrever:
+        _ = load_dotenv(find_dotenv())
+        client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=os.environ["OPENROUTER_API_KEY"])
+
+    info = probe_media(args.source)
+    print(f"{args.source}: {info.duration:.0f}s, {info.audio_codec}, {info.sample_rate} Hz, "
+          f"{info.channels} canais, {info.audio_bitrate} kb/s")
+
+    print(f"{'perfil':<8} {'chunks':>6} {'MB enviados':>12} {'extração':>10} {'transcrição':>12} {'total':>8}")
+    for profile in args.perfis:
+        r = mede_perfil(args.source, profile, args.workers, info, client)
+        transcricao = f"{r['transcricao']:.1f}s" if r['transcricao'] is not None else "-"
+        total = f"{r['extracao'] + (r['transcricao'] or 0):.1f}s"
+        print(f"{r['perfil']:<8} {r['chunks']:>6} {r['mb']:>12.2f} {r['extracao']:>9.1f}s {transcricao:>12} {total:>8}")
+
+
+if __name__ == "__main__":
+    main()
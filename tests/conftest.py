@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Os módulos do app ficam na raiz do repositório, sem pacote instalável
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches e limites lidos na importação de utils: os testes não tocam nos do usuário
+os.environ['VIDSYNTH_CACHE_DIR'] = tempfile.mkdtemp(prefix='vidsynth_tests_')
+os.environ['RATE_LIMIT_DB'] = ''
@@ -0,0 +1,84 @@
+import shutil
+import subprocess
+
+import pytest
+
+import utils
+
+pytestmark = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg não disponível")
+
+
+@pytest.fixture
+def short_video(tmp_path):
+    # Vídeo curto o bastante para caber em um único chunk
+    path = tmp_path / 'curto.mp4'
+    subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=64x64:rate=5',
+                    '-f', 'lavfi', '-i', 'sine=frequency=440', '-t', '30',
+                    '-c:v', 'mpeg4', '-c:a', 'aac', str(path)], check=True)
+    return str(path)
+
+
+def test_single_chunk_plan_writes_one_chunk(short_video, tmp_path):
+    # Um vídeo menor que um chunk vira um único arquivo com a trilha inteira
+    out = tmp_path / 'chunks'
+    out.mkdir()
+    chunks = list(utils.iter_audio_segments(short_video, str(out), profile='mp3', workers=4, align_silence=True))
+
+    assert len(chunks) == 1
+    chunk_path, start, end = chunks[0]
+    assert (start, end) == (0.0, pytest.approx(30, abs=0.1))
+    assert utils.probe_media(chunk_path).duration == pytest.approx(30, abs=0.5)
+
+
+def _gera(path, *args):
+    subprocess.run(['ffmpeg', '-v', 'error'] + list(args) + [str(path)], check=True)
+    return str(path)
+
+
+def test_speech_envelope_is_decoded_once(tmp_path, monkeypatch):
+    # Tom contínuo: o VAD não remove nada, mas os cortes ainda são alinhados com o mesmo envelope
+    video = _gera(tmp_path / 'longo.mp4', '-f', 'lavfi', '-i', 'testsrc=size=64x64:rate=5',
+                  '-f', 'lavfi', '-i', 'sine=frequency=440', '-t', '150', '-c:v', 'mpeg4', '-c:a', 'aac')
+    decodificacoes = []
+    original = utils.compute_energy_envelope
+    monkeypatch.setattr(utils, 'compute_energy_envelope',
+                        lambda *args, **kwargs: decodificacoes.append(1) or original(*args, **kwargs))
+
+    offset_map, envelope = utils.analyze_speech(video, profile='speech')
+    out = tmp_path / 'chunks'
+    out.mkdir()
+    chunks = list(utils.iter_audio_segments(video, str(out), profile='speech', workers=4, align_silence=True,
+                                            offset_map=offset_map, envelope=envelope))
+
+    assert offset_map is None and envelope is not None
+    assert len(chunks) == 2
+    assert decodificacoes == [1]
+
+
+def test_passthrough_audio_skips_speech_detection(tmp_path, monkeypatch):
+    audio = _gera(tmp_path / 'fala.mp3', '-f', 'lavfi', '-i', 'sine=frequency=440', '-t', '20',
+                  '-c:a', 'libmp3lame', '-b:a', '64k')
+    monkeypatch.setattr(utils, 'compute_energy_envelope',
+                        lambda *args, **kwargs: pytest.fail("áudio enviado como está não deve ser decodificado"))
+
+    assert utils.analyze_speech(audio) == (None, None)
+
+
+@pytest.mark.parametrize('profile', sorted(utils.AUDIO_PROFILES))
+def test_extraction_is_byte_identical_across_runs(short_video, tmp_path, profile):
+    # O cache de transcrições é indexado pelo hash do chunk: extrair de novo precisa dar os mesmos bytes
+    hashes = []
+    for rodada in range(2):
+        out = tmp_path / f'rodada{rodada}'
+        out.mkdir()
+        chunks = list(utils.iter_audio_segments(short_video, str(out), profile=profile))
+        hashes.append([utils.hash_file(chunk_path) for chunk_path, _start, _end in chunks])
+    assert hashes[0] == hashes[1]
+
+
+def test_auto_vad_keeps_stream_copy(short_video, monkeypatch):
+    # AAC com perfil mp3 é copiado nos chunks: no modo "auto" o VAD não força uma recodificação
+    monkeypatch.setattr(utils, 'compute_energy_envelope',
+                        lambda *args, **kwargs: pytest.fail("trilha copiada não deve ser decodificada"))
+
+    assert utils.analyze_speech(short_video, profile='mp3', modo='auto') == (None, None)
@@ -0,0 +1,32 @@
+import os
+
+import utils
+
+
+def test_running_total_tracks_writes_and_replacements(tmp_path):
+    cache = utils.DiskCache(tmp_path, max_bytes=1000)
+    cache.set('a', b'x' * 100)
+    cache.set('b', b'x' * 200)
+    cache.set('a', b'x' * 50)  # substituição não conta o tamanho antigo
+
+    assert cache._total == 250
+    assert utils.DiskCache(tmp_path, max_bytes=1000)._total == 250
+
+
+def test_evicts_least_recently_used_only_when_over_limit(tmp_path, monkeypatch):
+    cache = utils.DiskCache(tmp_path, max_bytes=300)
+    varreduras = []
+    original = cache._entradas
+    monkeypatch.setattr(cache, '_entradas', lambda: varreduras.append(1) or original())
+
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.set(key, b'x' * 100)
+        os.utime(tmp_path / key, (i, i))
+    assert varreduras == []
+
+    cache.get('a')  # 'b' passa a ser a entrada menos usada
+    cache.set('d', b'x' * 100)
+
+    assert varreduras == [1]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a', 'c', 'd']
+    assert cache._total == 300
@@ -0,0 +1,73 @@
+import hashlib
+import http.server
+import os
+import re
+import threading
+
+import pytest
+
+import utils
+
+DADOS = os.urandom(300 * 1024 + 7)
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    # modo: 'range' (Range completo), 'sem_range' (ignora Range) ou 'sem_total' (Content-Range "bytes a-b/*")
+    modo = 'range'
+    pedidos = []
+
+    def do_GET(self):
+        faixa = self.headers.get('Range')
+        self.pedidos.append(faixa)
+        match = re.match(r'bytes=(\d+)-(\d+)', faixa or '')
+        if match and self.modo != 'sem_range':
+            inicio, fim = int(match.group(1)), int(match.group(2))
+            corpo = DADOS[inicio:fim + 1]
+            total = '*' if self.modo == 'sem_total' else len(DADOS)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{inicio + len(corpo) - 1}/{total}')
+        else:
+            corpo = DADOS
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    def inicia(modo):
+        handler = type('Handler', (RangeHandler,), {'modo': modo, 'pedidos': []})
+        srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servidores.append(srv)
+        return f"http://127.0.0.1:{srv.server_address[1]}/video.mp4", handler.pedidos
+
+    servidores = []
+    yield inicia
+    for srv in servidores:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.mark.parametrize('modo', ['range', 'sem_range', 'sem_total'])
+def test_download_matches_source(servidor, tmp_path, modo):
+    url, pedidos = servidor(modo)
+    destino = tmp_path / 'video.mp4'
+
+    sha256 = utils.download_to_spool(url, str(destino), workers=4, part_size=64 * 1024)
+
+    assert destino.read_bytes() == DADOS
+    assert sha256 == hashlib.sha256(DADOS).hexdigest()
+    if modo == 'range':
+        # Sonda de 1 byte seguida das partes em paralelo
+        assert len(pedidos) == 1 + 5
+    elif modo == 'sem_range':
+        # A resposta da sonda já é o arquivo inteiro
+        assert pedidos == ['bytes=0-0']
+    else:
+        # Sem o tamanho total, o arquivo é pedido de novo sem Range
+        assert pedidos == ['bytes=0-0', None]
@@ -0,0 +1,168 @@
+"""
+Gravação longa de ponta a ponta sem a API: uma transcrição sintética de 12 horas é
+lida do disco por TranscriptFile, resumida com um cliente falso e convertida em
+SRT, texto e PDFs, com um teto para o crescimento da memória residente (RSS). Os
+downloads de uma gravação longa também são medidos: só o arquivo escolhido vai à memória.
+"""
+import json
+import os
+import re
+import threading
+import types
+
+import pytest
+
+import app
+import utils
+
+HORAS = 12
+PASSO_MS = 3000
+PALAVRAS = ("os dados do trimestre mostram crescimento consistente nas vendas da região "
+            "e a equipe vai revisar as metas na próxima reunião de planejamento").split()
+RSS_GROWTH_FACTOR = 4  # crescimento máximo do RSS em múltiplos do tamanho do SRT
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason="RSS lido de /proc")
+
+
+def _rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class RssSampler(threading.Thread):
+    """Acompanha o maior RSS do processo enquanto o bloco executa."""
+
+    def __init__(self, intervalo=0.05):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.base = _rss()
+        self.pico = self.base
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.is_set():
+            self.pico = max(self.pico, _rss())
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self.join()
+        self.pico = max(self.pico, _rss())
+
+    @property
+    def crescimento(self):
+        return self.pico - self.base
+
+
+def _chunk(texto):
+    delta = types.SimpleNamespace(content=texto)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+class FakeCompletions:
+    """Responde cada lote com um array JSON válido, em streaming, como a API de chat."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def create(self, messages, stream=False, **kwargs):
+        with self._lock:
+            self.chamadas += 1
+        itens = re.findall(r'^\[(\d+)\] (\S+)', messages[-1]['content'], flags=re.M)
+        conteudo = json.dumps([{"n": int(n), "resumo": f"Tópico {n}: resumo de {palavra}."}
+                               for n, palavra in itens], ensure_ascii=False)
+        return iter([_chunk(conteudo[i:i + 50]) for i in range(0, len(conteudo), 50)])
+
+
+@pytest.fixture
+def fake_client():
+    client = types.SimpleNamespace(base_url='http://fake', chat=types.SimpleNamespace(completions=FakeCompletions()))
+    return client
+
+
+@pytest.fixture
+def isolated_api_state(tmp_path, monkeypatch):
+    # Cache de respostas isolado e sem limites de taxa: o teste mede só o pipeline
+    cache = utils.DiskCache(tmp_path / 'completions', 10 * 1024 * 1024)
+    limiters = {'chat': utils.RateLimiter('chat', 0, 0), 'transcricao': utils.RateLimiter('transcricao', 0, 0)}
+    monkeypatch.setattr(app, 'get_completion_cache', lambda: cache)
+    monkeypatch.setattr(app, 'get_rate_limiters', lambda: limiters)
+
+
+@pytest.fixture
+def twelve_hour_srt(tmp_path):
+    # Escrito legenda a legenda: a transcrição nunca existe inteira na memória do teste
+    path = tmp_path / 'transcricao.srt'
+    total = HORAS * 3600 * 1000 // PASSO_MS
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(total):
+            texto = f"trecho{i} " + " ".join(PALAVRAS[(i + j) % len(PALAVRAS)] for j in range(40))
+            f.write(utils.formata_segmento_srt(i + 1, utils.Segment(i * PASSO_MS, i * PASSO_MS + 2800, texto)))
+    return path, total
+
+
+def test_twelve_hour_transcript_stays_within_memory_ceiling(twelve_hour_srt, fake_client, isolated_api_state,
+                                                            tmp_path):
+    srt_path, total = twelve_hour_srt
+    transcript = utils.TranscriptFile(str(srt_path), total)
+    destinos = {nome: str(tmp_path / nome) for nome in ('resumo.srt', 'resumo.txt', 'resumo.pdf')}
+    completa = tmp_path / 'transcricao_completa.pdf'
+
+    with RssSampler() as rss:
+        app.write_summary_files(transcript, fake_client, 'modelo', destinos)
+        utils.create_pdf_file(utils.iter_paragraphs(transcript.iter_text()), completa)
+
+    resumos = list(utils.TranscriptFile(destinos['resumo.srt']))
+    assert resumos[0].start_ms == 0
+    assert resumos[-1].end_ms == (total - 1) * PASSO_MS + 2800
+    assert all(a.end_ms <= b.start_ms for a, b in zip(resumos, resumos[1:]))
+    assert fake_client.chat.completions.chamadas == -(-len(resumos) // app.SUMMARY_BATCH_GROUPS)
+    assert os.path.getsize(destinos['resumo.pdf']) > 0
+    assert os.path.getsize(completa) > os.path.getsize(srt_path) // 10
+    # Uma cópia da transcrição em objetos Python já custa ~3,5x o tamanho do SRT
+    limite = RSS_GROWTH_FACTOR * os.path.getsize(srt_path)
+    assert rss.crescimento < limite, f"RSS cresceu {rss.crescimento / 2**20:.1f} MB (limite {limite / 2**20:.1f} MB)"
+
+
+def _pagina_de_downloads():
+    import app
+    app.show_downloads()
+
+
+def test_long_form_downloads_load_only_the_chosen_file(tmp_path):
+    # O AppTest guarda os downloads num MediaFileManager em memória, como o servidor
+    from streamlit.testing.v1 import AppTest
+
+    tamanho = 16 * 2**20
+    docs = utils.SessionDocuments(sob_demanda=True)
+    arquivos = []
+    for nome in ('resumo.pdf', 'resumo.srt', 'completa.pdf', 'completa.srt'):
+        path = os.path.join(docs.directory, nome)
+        with open(path, 'wb') as f:
+            for _bloco in range(tamanho // 2**20):
+                f.write(os.urandom(2**20))
+        arquivos.append((f"Baixar {nome}", path, "application/octet-stream"))
+    docs.downloads = {"Resumo": arquivos[:2], "Completa": arquivos[2:]}
+
+    at = AppTest.from_function(_pagina_de_downloads)
+    at.session_state["documentos"] = docs
+    try:
+        with RssSampler() as rss:
+            at.run()
+        assert not at.exception
+        assert rss.crescimento < tamanho, "nenhum arquivo deveria ser lido antes da escolha"
+
+        with RssSampler() as rss:
+            at.button(key=f"preparar-{arquivos[3][1]}").click().run()
+        assert not at.exception
+        assert docs.escolhido == arquivos[3][1]
+        assert len(at.button) == 3  # os outros seguem como "Preparar"
+        assert rss.crescimento < 2 * tamanho, \
+            f"RSS cresceu {rss.crescimento / 2**20:.1f} MB com um arquivo de {tamanho / 2**20:.0f} MB"
+    finally:
+        docs.release()
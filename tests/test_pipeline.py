@@ -0,0 +1,53 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+import utils
+
+
+def test_results_come_back_in_item_order():
+    def consume(i):
+        time.sleep(0.001 * (i % 5))
+        return i * 10
+
+    assert list(utils.run_pipeline_in_order(range(50), consume, workers=4, queue_size=4)) == \
+        [i * 10 for i in range(50)]
+
+
+def test_stalled_first_item_bounds_work_in_flight():
+    # O item 0 demora; sem o limite, os outros workers seguiriam produzindo resultados
+    iniciados = []
+    lock = threading.Lock()
+
+    def consume(i):
+        with lock:
+            iniciados.append(i)
+        if i == 0:
+            time.sleep(0.5)
+        return i
+
+    resultados = utils.run_pipeline_in_order(itertools.count(), consume, workers=4, queue_size=8)
+    assert next(resultados) == 0
+    with lock:
+        assert len(iniciados) <= 4 + 8
+    resultados.close()
+
+
+def test_consumer_error_propagates_and_stops_producer():
+    produzidos = []
+
+    def items():
+        for i in itertools.count():
+            produzidos.append(i)
+            yield i
+
+    def consume(i):
+        if i == 3:
+            raise RuntimeError("falha no item 3")
+        return i
+
+    with pytest.raises(RuntimeError, match="item 3"):
+        list(utils.run_pipeline_in_order(items(), consume, workers=2, queue_size=2))
+    assert len(produzidos) < 100
@@ -0,0 +1,50 @@
+import http.server
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('getter', [app.get_rate_limiters, app.get_transcription_cache,
+                                    app.get_completion_cache, app.get_chat_stats, app.get_connection_stats,
+                                    lambda: app.get_shared_openai_client('chave-de-teste')])
+def test_worker_threads_see_the_script_thread_instance(getter):
+    # Os workers do pipeline rodam sem contexto do Streamlit; ainda assim o recurso é o mesmo
+    principal = getter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        instancias = list(executor.map(lambda _: getter(), range(8)))
+    assert all(instancia is principal for instancia in instancias)
+
+
+class ModelosHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como a API
+
+    def do_GET(self):
+        corpo = b'{"object": "list", "data": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_requests_from_workers_are_counted_in_shared_stats():
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ModelosHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        # with_options reaproveita o cliente httpx (e o event hook) do cliente compartilhado
+        client = app.get_shared_openai_client('chave-de-teste').with_options(
+            base_url=f"http://127.0.0.1:{srv.server_address[1]}/v1", max_retries=0)
+        stats = app.get_connection_stats()
+        antes = stats.requisicoes
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: client.models.list(), range(3)))
+        assert stats.requisicoes - antes == 3
+    finally:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,63 @@
+import io
+
+import utils
+from utils import Segment
+
+
+def _cues(texto):
+    return [(seg.start_ms, seg.end_ms, seg.text) for seg in utils.iter_srt_segments(texto.splitlines())]
+
+
+def _merge(chunks, janela=utils.SRT_REORDER_WINDOW):
+    destino = io.StringIO()
+    merger = utils.SrtMerger(destino, janela=janela)
+    for segments, offset in chunks:
+        merger.add_chunk(segments, offset)
+    merger.close()
+    return destino.getvalue(), merger
+
+
+def test_offsets_and_global_numbering():
+    srt, merger = _merge([
+        ([Segment(0, 1000, 'a'), Segment(1000, 2000, 'b')], 0),
+        ([Segment(0, 1500, 'c')], 10),
+    ])
+    assert _cues(srt) == [(0, 1000, 'a'), (1000, 2000, 'b'), (10000, 11500, 'c')]
+    assert [linha for linha in srt.splitlines()[::4]] == ['1', '2', '3']
+    assert merger.count == 3
+    assert [seg.text for seg in merger.transcript] == ['a', 'b', 'c']
+
+
+def test_overlapping_chunk_edge_shortens_previous_cue():
+    srt, _merger = _merge([
+        ([Segment(0, 1000, 'a'), Segment(5000, 9500, 'b')], 0),
+        ([Segment(0, 1000, 'c')], 9),
+    ])
+    assert _cues(srt) == [(0, 1000, 'a'), (5000, 9000, 'b'), (9000, 10000, 'c')]
+
+
+def test_out_of_order_within_window_is_sorted():
+    srt, _merger = _merge([
+        ([Segment(3000, 4000, 'd')], 0),
+        ([Segment(0, 1000, 'a'), Segment(1000, 2000, 'b')], 0),
+    ])
+    assert [texto for _inicio, _fim, texto in _cues(srt)] == ['a', 'b', 'd']
+
+
+def test_late_segment_is_merged_without_zero_length_cues():
+    srt, merger = _merge([
+        ([Segment(0, 1000, 'a'), Segment(5000, 9500, 'b')], 0),
+        ([Segment(0, 1000, 'c'), Segment(2000, 3000, 'd')], 9),
+        ([Segment(0, 100, 'late')], 0),
+    ], janela=1)
+    cues = _cues(srt)
+    assert all(fim > inicio for inicio, fim, _texto in cues)
+    assert [inicio for inicio, _fim, _texto in cues] == sorted(inicio for inicio, _fim, _texto in cues)
+    assert 'late' in ' '.join(texto for _inicio, _fim, texto in cues)
+    assert merger.count == len(cues) == 4
+    assert srt.splitlines()[::4] == ['1', '2', '3', '4']
+
+
+def test_cues_starting_together_are_merged():
+    srt, _merger = _merge([([Segment(0, 1000, 'a'), Segment(0, 2000, 'b')], 0)])
+    assert _cues(srt) == [(0, 2000, 'a b')]
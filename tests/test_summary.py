@@ -0,0 +1,73 @@
+import types
+
+import pytest
+
+import app
+import utils
+from utils import Segment
+
+
+class RespostasFixas:
+    """Devolve as respostas na ordem dada, uma por chamada, em streaming como a API."""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.chamadas = 0
+
+    def create(self, **kwargs):
+        conteudo = self.respostas[min(self.chamadas, len(self.respostas) - 1)]
+        self.chamadas += 1
+        delta = types.SimpleNamespace(content=conteudo)
+        return iter([types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])])
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = utils.DiskCache(tmp_path / 'completions', 1024 * 1024)
+    limiters = {'chat': utils.RateLimiter('chat', 0, 0)}
+    monkeypatch.setattr(app, 'get_completion_cache', lambda: cache)
+    monkeypatch.setattr(app, 'get_rate_limiters', lambda: limiters)
+    monkeypatch.setattr(utils.time, 'sleep', lambda _segundos: None)
+    return cache
+
+
+def _client(*respostas):
+    completions = RespostasFixas(*respostas)
+    return types.SimpleNamespace(base_url='http://fake', chat=types.SimpleNamespace(completions=completions))
+
+
+GRUPO = [Segment(0, 1000, 'primeira fala'), Segment(1000, 2500, 'segunda fala')]
+
+
+def test_empty_completion_is_not_cached(cache):
+    client = _client("", "Título: explicação")
+    mensagens = [{"role": "user", "content": "oi"}]
+    assert app.chat_completion(client, 'modelo', mensagens, 10, 0) == ""
+    assert app.chat_completion(client, 'modelo', mensagens, 10, 0) == "Título: explicação"
+    assert app.chat_completion(client, 'modelo', mensagens, 10, 0) == "Título: explicação"
+    assert client.chat.completions.chamadas == 2
+
+
+def test_malformed_group_summary_is_retried_without_cache(cache):
+    client = _client("sem formato", "Título: *explicação*")
+    resumo = app.resume_grupo_com_retry(client, 'modelo', GRUPO)
+    assert (resumo.start_ms, resumo.end_ms, resumo.text) == (0, 2500, "Título: explicação")
+    assert client.chat.completions.chamadas == 2
+
+    # A resposta válida substituiu a malformada no cache
+    novo = _client("não deveria ser chamado")
+    assert app.resume_grupo_com_retry(novo, 'modelo', GRUPO).text == "Título: explicação"
+    assert novo.chat.completions.chamadas == 0
+
+
+def test_group_summary_keeps_last_response_after_retries(cache):
+    client = _client("sem formato")
+    assert app.resume_grupo_com_retry(client, 'modelo', GRUPO, max_retries=2).text == "sem formato"
+    assert client.chat.completions.chamadas == 2
+
+
+def test_empty_group_summary_raises_after_retries(cache):
+    client = _client("")
+    with pytest.raises(app.ResumoInvalido):
+        app.resume_grupo_com_retry(client, 'modelo', GRUPO, max_retries=2)
+    assert client.chat.completions.chamadas == 2
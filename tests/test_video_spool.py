@@ -0,0 +1,37 @@
+import gc
+import os
+
+import utils
+
+
+def test_spool_file_removed_when_session_state_is_dropped():
+    session_state = {'video_spool': utils.VideoSpool('Upload Local', 'arquivo-1')}
+    path = session_state['video_spool'].path
+    assert os.path.exists(path)
+
+    session_state.clear()
+    gc.collect()
+
+    assert not os.path.exists(path)
+
+
+def test_release_is_idempotent():
+    spool = utils.VideoSpool('Upload Local', 'arquivo-1')
+    spool.release()
+    spool.release()
+    assert not os.path.exists(spool.path)
+
+
+def test_sweep_removes_only_stale_spools(tmp_path):
+    velho = tmp_path / f"{utils.SPOOL_PREFIX}velho.mp4"
+    novo = tmp_path / f"{utils.SPOOL_PREFIX}novo.mp4"
+    outro = tmp_path / 'outro.mp4'
+    for path in (velho, novo, outro):
+        path.write_bytes(b'x')
+    os.utime(velho, (0, 0))
+    os.utime(outro, (0, 0))
+
+    utils.sweep_stale_spools(max_age=3600, directory=tmp_path)
+
+    assert not velho.exists()
+    assert novo.exists() and outro.exists()
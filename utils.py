@@ -1,14 +1,12 @@
 import streamlit as st
 import os
-import base64
 import logging
 import tempfile
 import datetime
 import hashlib
-from io import BytesIO
+from io import StringIO
 from pathlib import Path
 import requests
-from moviepy.editor import VideoFileClip, AudioFileClip
 from pydub import AudioSegment
 import srt
 from reportlab.lib.pagesizes import letter
@@ -25,6 +23,23 @@ import pickle
 from google_auth_oauthlib.flow import Flow
 import webbrowser
 import re
+import subprocess
+import shutil
+import time
+import queue
+import threading
+import math
+from contextlib import contextmanager, closing
+from collections import namedtuple, deque
+from functools import lru_cache, wraps
+from bisect import bisect_left, bisect_right
+import json
+import heapq
+import sqlite3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from moviepy.config import get_setting
+import numpy as np
 
 # CONFIGURAÇÕES GERAIS DE PASTAS
 # Configurar logging
@@ -38,40 +53,1245 @@ ARQUIVO_VIDEO_TEMP = PASTA_TEMP / 'video.mp4'
 
 MAX_CHUNK_SIZE = 25 * 1024 * 1024  # 25 MB em bytes
 
+# Envelope de energia usado para alinhar os cortes dos chunks às pausas da fala
+ENVELOPE_SAMPLE_RATE = 8000
+ENVELOPE_FRAME_MS = 20
+SILENCE_TOLERANCE = 30  # segundos que um corte pode ser deslocado até uma pausa
+
+# Remoção de trechos sem fala (VAD) antes do envio à transcrição. Remover pausas exige
+# decodificar e recodificar o áudio: em "auto" isso só é feito quando a trilha já seria
+# recodificada de qualquer forma, sem trocar a cópia direta (user-001) por uma
+# recodificação completa; "1" aplica sempre que houver silêncio suficiente e "0" desativa
+VAD_MODE = os.getenv("VAD_ENABLED", "auto")
+VAD_MIN_SILENCE = 2.0   # só pausas mais longas que isto são removidas (segundos)
+VAD_PADDING = 0.3       # margem de áudio mantida em volta de cada trecho de fala (segundos)
+VAD_MIN_GAIN = 0.05     # fração mínima de silêncio removido para valer a recodificação
+
+# Cache persistente em disco (sobrevive a reruns e reinícios do app)
+CACHE_DIR = Path(os.getenv("VIDSYNTH_CACHE_DIR", Path.home() / '.cache' / 'vidsynth'))
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "200")) * 1024 * 1024
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_MB", "500")) * 1024 * 1024
+COMPLETION_CACHE_MAX_BYTES = int(os.getenv("COMPLETION_CACHE_MAX_MB", "100")) * 1024 * 1024
+COMPLETION_CACHE_TTL = int(os.getenv("COMPLETION_CACHE_TTL_DAYS", "30")) * 24 * 3600
+
+# Download de vídeos remotos (GCS/S3) com requisições HTTP Range em paralelo
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+DOWNLOAD_RETRIES = 3
+
+# Vídeos gravados em disco por sessão; os órfãos (sessões encerradas sem liberar) são varridos
+SPOOL_PREFIX = 'vidsynth-spool-'
+SPOOL_MAX_AGE = float(os.getenv("SPOOL_MAX_AGE_HOURS", "24")) * 3600
+
+# Limites de uso da API compartilhados pelo processo (0 desativa o orçamento). Com
+# RATE_LIMIT_DB, os orçamentos ficam num SQLite e valem para todos os processos
+TRANSCRIPTION_RPM = int(os.getenv("TRANSCRIPTION_RPM", "50"))
+TRANSCRIPTION_AUDIO_SPM = int(os.getenv("TRANSCRIPTION_AUDIO_SPM", "0"))  # segundos de áudio por minuto
+CHAT_RPM = int(os.getenv("CHAT_RPM", "200"))
+CHAT_TPM = int(os.getenv("CHAT_TPM", "200000"))  # tokens estimados por minuto
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "")
+
+# Janela de reordenação da junção dos SRTs: segmentos fora de ordem nas bordas dos chunks
+SRT_REORDER_WINDOW = 8
+
+# Mesmo binário do ffmpeg usado pelo moviepy (imageio-ffmpeg)
+FFMPEG_BINARY = get_setting("FFMPEG_BINARY")
+
+# Codecs de áudio aceitos pela API de transcrição sem recodificação:
+# codec -> (extensão do chunk, formato de saída do ffmpeg)
+CODECS_ACEITOS = {
+    'mp3': ('.mp3', 'mp3'),
+    'aac': ('.m4a', 'ipod'),
+    'flac': ('.flac', 'flac'),
+    'vorbis': ('.ogg', 'ogg'),
+    'opus': ('.ogg', 'ogg'),
+}
+
+# Perfis de codificação dos chunks enviados à transcrição. "mp3" mantém o comportamento
+# original (e copia a trilha quando o codec já é aceito); "speech" reduz o áudio ao que
+# o reconhecimento de fala precisa (mono, 16 kHz, Opus 24k), com horas por chunk
+AUDIO_PROFILES = {
+    'mp3': {
+        'codec_args': ['-c:a', 'libmp3lame', '-b:a', '64k'],
+        'bitrate_kbps': 64,
+        'extensao': '.mp3',
+        'formato': 'mp3',
+        'permite_copia': True,
+    },
+    'speech': {
+        # +bitexact: o muxer Ogg usaria um número de série aleatório a cada execução, e os
+        # bytes diferentes impediriam o cache de transcrições (indexado pelo hash do chunk)
+        'codec_args': ['-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip',
+                       '-fflags', '+bitexact'],
+        'bitrate_kbps': 24,
+        'extensao': '.ogg',
+        'formato': 'ogg',
+        'permite_copia': False,
+    },
+}
+AUDIO_PROFILE = os.getenv("AUDIO_PROFILE", "mp3")
+
+# Modelo, idioma e formato da transcrição: entram na chave do cache e na impressão digital do job,
+# e são os mesmos no app e no benchmark dos perfis
+TRANSCRIPTION_PARAMS = ('whisper-1', 'pt', 'srt')
+
+# Arquivos de áudio que a API aceita como estão: extensão -> (codecs, extensão enviada à API)
+CONTAINERS_ACEITOS = {
+    '.mp3': ({'mp3'}, '.mp3'),
+    '.m4a': ({'aac'}, '.m4a'),
+    '.wav': ({'pcm_s16le'}, '.wav'),
+    '.flac': ({'flac'}, '.flac'),
+    '.ogg': ({'vorbis', 'opus'}, '.ogg'),
+    '.oga': ({'vorbis', 'opus'}, '.ogg'),
+    '.opus': ({'opus'}, '.ogg'),  # .opus é um container Ogg, mas a API só reconhece .ogg
+    '.webm': ({'vorbis', 'opus'}, '.webm'),
+}
+
 ########################################
-#FUNÇÃO DE PROCESSAMENTO DE AUDIO E VÍDEO
+#FUNÇÃO DE EXTRAÇÃO DE ÁUDIO COM FFMPEG
 ########################################
-def split_audio(audio_path, chunk_duration=1200):  # 20 minutos por chunk
-    audio = AudioFileClip(audio_path)
-    duration = audio.duration
-    chunks = []
-    
-    for start in range(0, int(duration), chunk_duration):
-        end = min(start + chunk_duration, duration)
-        chunk = audio.subclip(start, end)
-        chunk_path = f"{audio_path}_{start}_{end}.mp3"
-        chunk.write_audiofile(chunk_path, bitrate="64k")  # Reduzindo a qualidade para manter o tamanho sob controle
-        
-        # Verificar o tamanho do arquivo
-        file_size = os.path.getsize(chunk_path)
-        if file_size > 25 * 1024 * 1024:  # Se o arquivo for maior que 25 MB
-            os.remove(chunk_path)  # Remove o arquivo grande
-            # Divide este chunk em dois menores
-            mid = (start + end) // 2
-            chunk1 = audio.subclip(start, mid)
-            chunk2 = audio.subclip(mid, end)
-            chunk_path1 = f"{audio_path}_{start}_{mid}.mp3"
-            chunk_path2 = f"{audio_path}_{mid}_{end}.mp3"
-            chunk1.write_audiofile(chunk_path1, bitrate="64k")
-            chunk2.write_audiofile(chunk_path2, bitrate="64k")
-            chunks.append((chunk_path1, start))
-            chunks.append((chunk_path2, mid))
+class StageTimer:
+    """Acumula o tempo de parede de cada etapa do processamento."""
+
+    def __init__(self):
+        self.tempos = {}
+        self.detalhes = {}
+
+    @contextmanager
+    def stage(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            decorrido = time.perf_counter() - inicio
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + decorrido
+            logger.info(f"Etapa '{nome}' concluída em {decorrido:.2f}s")
+
+    def resumo(self):
+        partes = [f"{nome}: {tempo:.2f}s" for nome, tempo in self.tempos.items()]
+        partes += [f"{nome}: {detalhe}" for nome, detalhe in self.detalhes.items()]
+        return ", ".join(partes)
+
+class PipelineStats:
+    """Métricas de um pipeline produtor/consumidor: profundidade da fila e ociosidade por etapa."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.produtor_ocioso = 0.0
+        self.consumidor_ocioso = 0.0
+        self.primeiro_resultado = None
+        self.fila_max = 0
+        self._fila_soma = 0
+        self._fila_amostras = 0
+
+    def registra_fila(self, profundidade):
+        with self._lock:
+            self.fila_max = max(self.fila_max, profundidade)
+            self._fila_soma += profundidade
+            self._fila_amostras += 1
+
+    def registra_ocioso(self, etapa, segundos):
+        with self._lock:
+            if etapa == 'produtor':
+                self.produtor_ocioso += segundos
+            else:
+                self.consumidor_ocioso += segundos
+
+    def registra_resultado(self):
+        with self._lock:
+            if self.primeiro_resultado is None:
+                self.primeiro_resultado = time.perf_counter() - self.inicio
+
+    @property
+    def fila_media(self):
+        return self._fila_soma / self._fila_amostras if self._fila_amostras else 0.0
+
+    def resumo(self):
+        primeiro = f"{self.primeiro_resultado:.2f}s" if self.primeiro_resultado is not None else "-"
+        return (f"primeiro chunk em {primeiro}, fila média {self.fila_media:.1f} (máx {self.fila_max}), "
+                f"produtor ocioso {self.produtor_ocioso:.2f}s, consumidores ociosos {self.consumidor_ocioso:.2f}s")
+
+class ChatStats:
+    """Tempo até o primeiro token e duração total de cada chamada de chat em streaming."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.ttfts = []
+        self.total = 0.0
+
+    def registra(self, ttft, duracao):
+        with self._lock:
+            self.chamadas += 1
+            self.total += duracao
+            if ttft is not None:
+                self.ttfts.append(ttft)
+
+    def resumo(self):
+        with self._lock:
+            if not self.chamadas:
+                return "nenhuma chamada"
+            ttfts = sorted(self.ttfts)
+        if not ttfts:
+            return f"{self.chamadas} chamadas, nenhum token recebido"
+        return (f"{self.chamadas} chamadas, primeiro token em {ttfts[len(ttfts) // 2]:.2f}s (mediana, "
+                f"máx {ttfts[-1]:.2f}s), {self.total / self.chamadas:.2f}s por chamada em média")
+
+class ConnectionStats:
+    """
+    Reuso das conexões HTTP de um cliente compartilhado, medido pelo trace do
+    httpcore: cada requisição conta uma vez e cada conexão TCP/TLS aberta também.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = 0
+        self.conexoes = 0
+        self.handshakes_tls = 0
+
+    def instrumenta(self, request):
+        # Event hook de requisição do httpx: liga o trace do httpcore à requisição
+        request.extensions['trace'] = self._trace
+        with self._lock:
+            self.requisicoes += 1
+
+    def _trace(self, evento, info):
+        if evento == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.conexoes += 1
+        elif evento == 'connection.start_tls.complete':
+            with self._lock:
+                self.handshakes_tls += 1
+
+    @property
+    def reuso(self):
+        return 1 - self.conexoes / self.requisicoes if self.requisicoes else 0.0
+
+    def resumo(self):
+        return (f"{self.requisicoes} requisições em {self.conexoes} conexões ({self.reuso:.0%} reaproveitadas), "
+                f"{self.handshakes_tls} handshakes TLS")
+
+def run_pipeline(items, consume, workers=1, queue_size=2, stats=None, vagas=None):
+    """
+    Executa `consume(item)` em `workers` threads enquanto outra thread continua
+    iterando `items` (tipicamente um gerador que produz arquivos). A fila limitada
+    segura o produtor quando os consumidores estão atrasados, mantendo disco e memória
+    estáveis. Gera (índice, resultado) na ordem em que os itens são concluídos.
+    Com `vagas` (um semáforo), o produtor ocupa uma vaga antes de enfileirar cada item
+    e quem consome os resultados é responsável por devolvê-la.
+    """
+    stats = stats or PipelineStats()
+    fila = queue.Queue(maxsize=max(1, queue_size))
+    resultados = queue.Queue()
+    parar = threading.Event()
+    FIM = object()
+
+    def produtor():
+        try:
+            for i, item in enumerate(items):
+                if parar.is_set():
+                    break
+                inicio = time.perf_counter()
+                if vagas is not None:
+                    while not vagas.acquire(timeout=0.1):
+                        if parar.is_set():
+                            return
+                fila.put((i, item))
+                stats.registra_ocioso('produtor', time.perf_counter() - inicio)
+                stats.registra_fila(fila.qsize())
+        except Exception as e:
+            parar.set()
+            resultados.put(('erro', None, e))
+        finally:
+            for _ in range(workers):
+                fila.put((None, FIM))
+            resultados.put(('fim', None, None))
+
+    def consumidor():
+        while True:
+            inicio = time.perf_counter()
+            i, item = fila.get()
+            stats.registra_ocioso('consumidor', time.perf_counter() - inicio)
+            stats.registra_fila(fila.qsize())
+            if item is FIM:
+                break
+            if parar.is_set():
+                continue  # Apenas drena a fila após uma falha
+            try:
+                resultados.put(('ok', i, consume(item)))
+            except Exception as e:
+                parar.set()
+                resultados.put(('erro', i, e))
+        resultados.put(('fim', None, None))
+
+    threads = [threading.Thread(target=produtor, daemon=True)]
+    threads += [threading.Thread(target=consumidor, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        pendentes = len(threads)
+        while pendentes:
+            tipo, i, valor = resultados.get()
+            if tipo == 'fim':
+                pendentes -= 1
+            elif tipo == 'erro':
+                raise valor
+            else:
+                stats.registra_resultado()
+                yield i, valor
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+def iter_in_order(resultados, ao_entregar=None):
+    """
+    Reordena os pares (índice, resultado) de run_pipeline, liberando cada um assim que
+    os anteriores chegam. `ao_entregar` é chamado depois que cada resultado é consumido.
+    """
+    prontos = {}
+    proximo = 0
+    for i, resultado in resultados:
+        prontos[i] = resultado
+        while proximo in prontos:
+            yield prontos.pop(proximo)
+            proximo += 1
+            if ao_entregar:
+                ao_entregar()
+
+def run_pipeline_in_order(items, consume, workers=1, queue_size=2, stats=None, max_in_flight=None):
+    """
+    run_pipeline com os resultados na ordem dos itens. Cada item ocupa uma vaga desde
+    antes de entrar na fila até ser entregue em ordem, então no máximo `max_in_flight`
+    itens (padrão: workers + queue_size) estão na fila, em processamento ou esperando
+    um anterior: se um item atrasa (numa nova tentativa, por exemplo), os demais
+    workers param em vez de acumular resultados na memória.
+    """
+    vagas = threading.Semaphore(max_in_flight or workers + queue_size)
+    return iter_in_order(run_pipeline(items, consume, workers, queue_size, stats, vagas), vagas.release)
+
+def run_ffmpeg(args):
+    cmd = [FFMPEG_BINARY, '-hide_banner', '-nostdin', '-y'] + list(args)
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        erro = result.stderr.decode('utf-8', errors='replace')[-2000:]
+        raise RuntimeError(f"ffmpeg falhou ({result.returncode}): {erro}")
+    return result
+
+# Metadados da mídia lidos uma única vez e repassados a todas as etapas
+MediaInfo = namedtuple('MediaInfo', ['source', 'duration', 'audio_codec', 'sample_rate',
+                                     'channels', 'audio_bitrate', 'has_video'])
+
+CANAIS = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '5.0': 5, '5.1': 6, '7.1': 8}
+
+def _probe_ffprobe(ffprobe, source):
+    result = subprocess.run([ffprobe, '-v', 'error', '-print_format', 'json',
+                             '-show_format', '-show_streams', source],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"Não foi possível ler a mídia: {source}")
+    dados = json.loads(result.stdout)
+    formato = dados.get('format', {})
+    streams = dados.get('streams', [])
+    audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), {})
+    has_video = any(stream.get('codec_type') == 'video' and not stream.get('disposition', {}).get('attached_pic')
+                    for stream in streams)
+
+    bitrate = audio.get('bit_rate') or (None if has_video else formato.get('bit_rate'))
+    duration = formato.get('duration') or audio.get('duration')
+    return MediaInfo(
+        source=source,
+        duration=float(duration) if duration else None,
+        audio_codec=audio.get('codec_name'),
+        sample_rate=int(audio['sample_rate']) if audio.get('sample_rate') else None,
+        channels=audio.get('channels'),
+        audio_bitrate=int(bitrate) // 1000 if bitrate else None,
+        has_video=has_video,
+    )
+
+def _probe_ffmpeg(source):
+    # Sem ffprobe: lê o cabeçalho impresso por "ffmpeg -i" (sem saída, nada é decodificado)
+    result = subprocess.run([FFMPEG_BINARY, '-hide_banner', '-nostdin', '-i', source],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    info = result.stderr.decode('utf-8', errors='replace')
+
+    duration = None
+    container_bitrate = None
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)(?:.*?bitrate: (\d+) kb/s)?', info)
+    if match:
+        horas, minutos, segundos, bitrate = match.groups()
+        duration = int(horas) * 3600 + int(minutos) * 60 + float(segundos)
+        container_bitrate = int(bitrate) if bitrate else None
+
+    has_video = any('attached pic' not in linha
+                    for linha in re.findall(r'Stream #\d+:\d+.*?: Video: [^\n]*', info))
+
+    audio_codec = sample_rate = channels = audio_bitrate = None
+    match = re.search(r'Stream #\d+:\d+.*?: Audio: (\w+)([^\n]*)', info)
+    if match:
+        audio_codec = match.group(1)
+        detalhes = match.group(2)
+        taxa = re.search(r'(\d+) Hz, ([^,]+)', detalhes)
+        if taxa:
+            sample_rate = int(taxa.group(1))
+            layout = taxa.group(2).split('(')[0].strip()
+            canais = re.match(r'(\d+) channels', layout)
+            channels = int(canais.group(1)) if canais else CANAIS.get(layout)
+        bitrate = re.search(r'(\d+) kb/s', detalhes)
+        if bitrate:
+            audio_bitrate = int(bitrate.group(1))
+        elif not has_video:
+            # Arquivo só de áudio: o bitrate do container é o da trilha
+            audio_bitrate = container_bitrate
+    elif duration is None:
+        raise RuntimeError(f"Não foi possível ler a mídia: {source}")
+
+    return MediaInfo(source, duration, audio_codec, sample_rate, channels, audio_bitrate, has_video)
+
+@lru_cache(maxsize=64)
+def _probe_cached(source, _mtime, _size):
+    ffprobe = shutil.which('ffprobe')
+    return _probe_ffprobe(ffprobe, source) if ffprobe else _probe_ffmpeg(source)
+
+def probe_media(source):
+    """
+    Lê duração, codec, taxa de amostragem, canais e bitrate da trilha de áudio sem
+    decodificar a mídia. O resultado fica em cache enquanto o arquivo não mudar.
+    """
+    try:
+        info = os.stat(source)
+        return _probe_cached(source, info.st_mtime, info.st_size)
+    except OSError:
+        return _probe_cached(source, None, None)  # URL remota
+
+def plan_chunks(duration, bitrate_kbps, max_bytes=MAX_CHUNK_SIZE, workers=1,
+                max_chunk_duration=None, min_chunk_duration=60, tolerance=0, margem=0.9):
+    """
+    Calcula de antemão as fronteiras [(start, end)] dos chunks a partir da duração,
+    do bitrate de saída e do limite de upload da API, de modo que nenhum chunk precise
+    ser recodificado. Com mais workers disponíveis, escolhe chunks menores (sem ficar
+    abaixo de `min_chunk_duration`) para que todos tenham trabalho. `tolerance` reserva
+    espaço para que cada corte possa ser deslocado depois até uma pausa.
+    """
+    # Maior duração que cabe no limite de upload, com margem para o overhead do container
+    limite = max_bytes * 8 * margem / (bitrate_kbps * 1000)
+    if max_chunk_duration:
+        limite = min(limite, max_chunk_duration)
+    limite = max(limite - 2 * tolerance, min_chunk_duration)
+
+    n_chunks = max(1, math.ceil(duration / limite))
+    if workers > n_chunks:
+        n_chunks = max(n_chunks, min(workers, int(duration // min_chunk_duration)))
+
+    passo = duration / n_chunks
+    return [(i * passo, duration if i == n_chunks - 1 else (i + 1) * passo)
+            for i in range(n_chunks)]
+
+def compute_energy_envelope(source, frame_ms=ENVELOPE_FRAME_MS, sample_rate=ENVELOPE_SAMPLE_RATE):
+    """
+    Decodifica o PCM uma única vez (mono, baixa taxa de amostragem) e devolve a energia
+    RMS de cada quadro de `frame_ms`. O áudio é lido em blocos direto do ffmpeg, então
+    a memória usada é só a do envelope, mesmo para gravações de várias horas.
+    """
+    frame = sample_rate * frame_ms // 1000
+    bloco = frame * 2 * 1000  # 1000 quadros de amostras int16 por leitura
+    proc = subprocess.Popen([FFMPEG_BINARY, '-hide_banner', '-nostdin', '-i', source,
+                             '-vn', '-map', '0:a:0', '-ac', '1', '-ar', str(sample_rate),
+                             '-f', 's16le', '-'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    partes = []
+    try:
+        while True:
+            data = proc.stdout.read(bloco)
+            if not data:
+                break
+            amostras = np.frombuffer(data, dtype=np.int16)
+            n = len(amostras) // frame * frame
+            if n == 0:
+                break
+            quadros = amostras[:n].astype(np.float32).reshape(-1, frame)
+            partes.append(np.sqrt(np.mean(quadros * quadros, axis=1)))
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg falhou ao decodificar o áudio de: {source}")
+    return np.concatenate(partes) if partes else np.zeros(0, dtype=np.float32)
+
+def snap_to_silence(envelope, cuts, tolerance=SILENCE_TOLERANCE, frame_ms=ENVELOPE_FRAME_MS, smooth_ms=300):
+    """Desloca cada corte (em segundos) para a pausa mais próxima dentro de `tolerance`."""
+    if len(envelope) == 0:
+        return list(cuts)
+
+    # Média móvel para preferir pausas reais em vez de quedas de um único quadro
+    k = max(1, smooth_ms // frame_ms)
+    suave = np.convolve(envelope, np.ones(k, dtype=np.float32) / k, mode='same')
+    tol = int(tolerance * 1000 / frame_ms)
+
+    resultado = []
+    anterior = 0
+    for cut in cuts:
+        centro = int(cut * 1000 / frame_ms)
+        lo = max(anterior + 1, centro - tol)
+        hi = min(len(suave), centro + tol + 1)
+        if lo >= hi:
+            resultado.append(cut)
+            continue
+        janela = suave[lo:hi]
+        # Quadros próximos do mínimo da janela contam como pausa; fica com o mais próximo do corte
+        minimo = janela.min()
+        limiar = minimo + 0.1 * (np.median(janela) - minimo)
+        candidatos = np.flatnonzero(janela <= limiar) + lo
+        escolhido = int(candidatos[np.argmin(np.abs(candidatos - centro))])
+        resultado.append(escolhido * frame_ms / 1000)
+        anterior = escolhido
+    return resultado
+
+def align_chunks_to_silence(source, plano, tolerance=SILENCE_TOLERANCE, envelope=None):
+    # `envelope` já calculado (pela detecção de fala) evita uma segunda decodificação completa
+    if len(plano) < 2:
+        return plano
+    if envelope is None:
+        envelope = compute_energy_envelope(source)
+    cortes = snap_to_silence(envelope, [end for _start, end in plano[:-1]], tolerance)
+    inicios = [plano[0][0]] + cortes
+    fins = cortes + [plano[-1][1]]
+    return list(zip(inicios, fins))
+
+class OffsetMap:
+    """
+    Mapa compacto do tempo do áudio comprimido (só trechos de fala, concatenados) de
+    volta ao tempo original do vídeo.
+    """
+    __slots__ = ('spans', 'duration', '_comp_starts')
+
+    def __init__(self, spans):
+        self.spans = spans  # [(orig_start, orig_end)] dos trechos mantidos
+        self._comp_starts = []
+        comp = 0.0
+        for orig_start, orig_end in spans:
+            self._comp_starts.append(comp)
+            comp += orig_end - orig_start
+        self.duration = comp
+
+    def to_original(self, t, fim=False):
+        # No limite entre dois trechos, um início pertence ao trecho seguinte e um fim ao anterior
+        busca = bisect_left if fim else bisect_right
+        i = max(0, busca(self._comp_starts, t) - 1)
+        orig_start, orig_end = self.spans[i]
+        original = orig_start + t - self._comp_starts[i]
+        return original if i == len(self.spans) - 1 else min(original, orig_end)
+
+    def original_spans(self, comp_start, comp_end):
+        """Trechos do tempo original que formam o intervalo [comp_start, comp_end) comprimido."""
+        trechos = []
+        i = max(0, bisect_right(self._comp_starts, comp_start) - 1)
+        while i < len(self.spans) and self._comp_starts[i] < comp_end:
+            orig_start, orig_end = self.spans[i]
+            deslocamento = self._comp_starts[i]
+            inicio = orig_start + max(0.0, comp_start - deslocamento)
+            fim = min(orig_end, orig_start + comp_end - deslocamento)
+            if fim > inicio:
+                trechos.append((inicio, fim))
+            i += 1
+        return trechos
+
+    def boundaries(self):
+        # Pontos do tempo comprimido onde havia uma pausa removida: cortes naturais para os chunks
+        return self._comp_starts[1:]
+
+def detect_speech(source, media_info=None, frame_ms=ENVELOPE_FRAME_MS, min_silence=VAD_MIN_SILENCE,
+                  padding=VAD_PADDING, min_gain=VAD_MIN_GAIN, envelope=None):
+    """
+    Detecta os trechos de fala a partir do envelope de energia e devolve um OffsetMap,
+    ou None quando há pouco silêncio para remover.
+    """
+    info = media_info or probe_media(source)
+    if envelope is None:
+        envelope = compute_energy_envelope(source, frame_ms=frame_ms)
+    if len(envelope) == 0:
+        return None
+
+    k = max(1, 300 // frame_ms)
+    suave = np.convolve(envelope, np.ones(k, dtype=np.float32) / k, mode='same')
+    ruido, fala = np.percentile(suave, [5, 95])
+    if fala <= ruido:
+        return None
+    limiar = ruido + 0.05 * (fala - ruido)
+
+    # Limites das sequências de quadros silenciosos
+    silencio = np.concatenate(([False], suave <= limiar, [False])).astype(np.int8)
+    bordas = np.flatnonzero(np.diff(silencio))
+    inicios, fins = bordas[0::2], bordas[1::2]
+    longos = (fins - inicios) * frame_ms / 1000 >= min_silence
+
+    duracao = info.duration or len(envelope) * frame_ms / 1000
+    spans = []
+    cursor = 0.0
+    for inicio, fim in zip(inicios[longos], fins[longos]):
+        # Silêncios nas pontas do arquivo são removidos por inteiro, sem margem
+        corte_inicio = float(inicio) * frame_ms / 1000 + padding if inicio > 0 else 0.0
+        corte_fim = float(fim) * frame_ms / 1000 - padding if fim < len(envelope) else duracao
+        if corte_inicio > cursor:
+            spans.append((cursor, corte_inicio))
+        cursor = max(cursor, corte_fim)
+    if cursor < duracao:
+        spans.append((cursor, duracao))
+    if not spans:
+        return None
+
+    offset_map = OffsetMap(spans)
+    removido = 1 - offset_map.duration / duracao
+    logger.info(f"VAD: {len(spans)} trechos de fala, {removido:.0%} do áudio removido")
+    return offset_map if removido >= min_gain else None
+
+def analyze_speech(source, media_info=None, profile=AUDIO_PROFILE, modo=VAD_MODE):
+    """
+    Prepara a remoção de silêncios antes da extração. Devolve (offset_map, envelope):
+    arquivos que seriam enviados à API como estão não passam pelo VAD, já que remover
+    as pausas exigiria recodificá-los, e no modo "auto" o mesmo vale para trilhas que
+    seriam copiadas nos chunks. Nos demais, o envelope decodificado para a detecção é
+    devolvido para alinhar os cortes sem decodificar o áudio de novo.
+    """
+    info = media_info or probe_media(source)
+    if modo == '0' or audio_passthrough_extension(source, info):
+        return None, None
+    if modo == 'auto' and audio_stream_copy(info, profile):
+        logger.info(f"VAD ignorado: a trilha {info.audio_codec} é copiada sem recodificação")
+        return None, None
+    envelope = compute_energy_envelope(source)
+    return detect_speech(source, info, envelope=envelope), envelope
+
+def snap_to_boundaries(cuts, boundaries, tolerance=SILENCE_TOLERANCE):
+    # Desloca cada corte para a pausa removida mais próxima, se houver uma dentro da tolerância
+    resultado = []
+    for cut in cuts:
+        i = bisect_left(boundaries, cut)
+        vizinhos = [b for b in boundaries[max(0, i - 1):i + 1] if abs(b - cut) <= tolerance]
+        melhor = min(vizinhos, key=lambda b: abs(b - cut)) if vizinhos else cut
+        resultado.append(max(melhor, resultado[-1] if resultado else 0.0))
+    return resultado
+
+def audio_passthrough_extension(source, info):
+    """
+    Para arquivos só de áudio que a API já aceita e que cabem em um único upload,
+    devolve a extensão com que devem ser enviados (sem nenhuma passada do ffmpeg).
+    """
+    if info.has_video or not os.path.isfile(source):
+        return None
+    codecs, extensao = CONTAINERS_ACEITOS.get(Path(source).suffix.lower(), (set(), None))
+    if info.audio_codec not in codecs or os.path.getsize(source) > MAX_CHUNK_SIZE:
+        return None
+    return extensao
+
+def audio_stream_copy(info, profile=AUDIO_PROFILE):
+    # Na cópia o bitrate é o do original; sem ele não dá para prever o tamanho dos chunks
+    return bool(AUDIO_PROFILES[profile]['permite_copia'] and info.audio_codec in CODECS_ACEITOS
+                and info.audio_bitrate)
+
+def link_or_copy(source, destino):
+    # O chunk é apagado após a transcrição: um hard link protege o arquivo original sem copiá-lo
+    try:
+        os.link(source, destino)
+    except OSError:
+        shutil.copyfile(source, destino)
+
+def plan_audio_extraction(source, profile=AUDIO_PROFILE, workers=1, max_chunk_duration=None, align_silence=False,
+                          media_info=None, offset_map=None, envelope=None):
+    """
+    Decide entre copiar a trilha de áudio ou codificá-la com o perfil `profile` e
+    planeja os chunks. Com `offset_map`, o plano é feito no tempo comprimido (só fala).
+    Retorna um dict com 'plano', 'codec_args', 'extensao' e 'formato'.
+    """
+    info = media_info or probe_media(source)
+    if not info.audio_codec:
+        raise RuntimeError(f"Nenhuma trilha de áudio encontrada em: {source}")
+
+    passthrough = None if offset_map else audio_passthrough_extension(source, info)
+    if passthrough:
+        logger.info(f"Áudio {info.audio_codec} aceito pela API, enviado sem recodificação: {source}")
+        return {'plano': [(0.0, info.duration)], 'codec_args': [], 'extensao': passthrough,
+                'formato': None, 'passthrough': True}
+
+    # Remover silêncios exige filtrar o áudio, então não há cópia com o VAD
+    perfil = AUDIO_PROFILES[profile]
+    copy = not offset_map and audio_stream_copy(info, profile)
+    if copy:
+        extensao, formato = CODECS_ACEITOS[info.audio_codec]
+        codec_args = ['-c:a', 'copy']
+        bitrate_kbps = info.audio_bitrate
+    else:
+        extensao, formato = perfil['extensao'], perfil['formato']
+        codec_args = perfil['codec_args']
+        bitrate_kbps = perfil['bitrate_kbps']
+
+    duracao = offset_map.duration if offset_map else info.duration
+    plano = plan_chunks(duracao, bitrate_kbps, workers=workers,
+                        max_chunk_duration=max_chunk_duration,
+                        tolerance=SILENCE_TOLERANCE if align_silence else 0)
+    if align_silence and offset_map:
+        # As pausas removidas já são os melhores pontos de corte; não é preciso decodificar de novo
+        cortes = snap_to_boundaries([end for _start, end in plano[:-1]], offset_map.boundaries())
+        plano = list(zip([plano[0][0]] + cortes, cortes + [plano[-1][1]]))
+    elif align_silence:
+        plano = align_chunks_to_silence(source, plano, envelope=envelope)
+    logger.info(f"Extraindo áudio ({'cópia' if copy else 'perfil ' + profile} de {info.audio_codec}) "
+                f"em {len(plano)} chunks de até {max(end - start for start, end in plano):.0f}s")
+
+    return {'plano': plano, 'codec_args': codec_args, 'extensao': extensao, 'formato': formato,
+            'passthrough': False}
+
+def iter_audio_segments(source, output_dir, profile=AUDIO_PROFILE, workers=1, max_chunk_duration=None,
+                        align_silence=False, media_info=None, offset_map=None, envelope=None):
+    """
+    Demultiplexa a trilha de áudio de `source` em chunks prontos para transcrição,
+    copiando o áudio quando o codec já é aceito pela API e recodificando com o perfil
+    `profile` caso contrário. Cada chunk é extraído com busca rápida na entrada (-ss
+    antes de -i) e entregue assim que fica pronto, o que permite transcrever o chunk N
+    enquanto o N+1 ainda está sendo gerado. Com `offset_map`, só os trechos de fala
+    entram nos chunks e start_time/end_time ficam no tempo comprimido.
+    Gera (chunk_path, start_time, end_time).
+    """
+    extracao = plan_audio_extraction(source, profile, workers, max_chunk_duration, align_silence, media_info,
+                                     offset_map, envelope)
+    if extracao['passthrough']:
+        chunk_path = os.path.join(output_dir, f"chunk_0000{extracao['extensao']}")
+        link_or_copy(source, chunk_path)
+        yield chunk_path, 0.0, extracao['plano'][0][1]
+        return
+    for i, (start, end) in enumerate(extracao['plano']):
+        chunk_path = os.path.join(output_dir, f"chunk_{i:04d}{extracao['extensao']}")
+        if offset_map:
+            # Lê do início do primeiro ao fim do último trecho e descarta as pausas com aselect
+            trechos = offset_map.original_spans(start, end)
+            inicio = trechos[0][0]
+            selecao = '+'.join(f"between(t,{a - inicio:.3f},{b - inicio:.3f})" for a, b in trechos)
+            run_ffmpeg(['-ss', f"{inicio:.3f}", '-t', f"{trechos[-1][1] - inicio:.3f}", '-i', source,
+                        '-vn', '-map', '0:a:0', '-af', f"aselect='{selecao}',asetpts=N/SR/TB"] +
+                       extracao['codec_args'] + ['-f', extracao['formato'], chunk_path])
         else:
-            chunks.append((chunk_path, start))
-    
-    audio.close()
-    return chunks
- 
+            run_ffmpeg(['-ss', f"{start:.3f}", '-t', f"{end - start:.3f}", '-i', source,
+                        '-vn', '-map', '0:a:0'] + extracao['codec_args'] +
+                       ['-f', extracao['formato'], chunk_path])
+        yield chunk_path, start, end
+
+########################################
+#FUNÇÃO DE RECURSOS COMPARTILHADOS PELO PROCESSO
+########################################
+_SINGLETONS = {}
+_SINGLETONS_LOCK = threading.RLock()  # reentrante: uma fábrica pode usar outro recurso
+
+def process_singleton(fabrica):
+    """
+    Decorador: a primeira chamada (por combinação de argumentos) cria o recurso e as
+    seguintes devolvem a mesma instância, de qualquer thread. Ao contrário do
+    st.cache_resource, não depende do contexto do script, então workers de
+    ThreadPoolExecutor enxergam os mesmos caches, contadores e limitadores da sessão.
+    """
+    @wraps(fabrica)
+    def wrapper(*args):
+        chave = (fabrica.__qualname__,) + args
+        with _SINGLETONS_LOCK:
+            if chave not in _SINGLETONS:
+                _SINGLETONS[chave] = fabrica(*args)
+            return _SINGLETONS[chave]
+    return wrapper
+
+########################################
+#FUNÇÃO DE CACHE EM DISCO
+########################################
+class DiskCache:
+    """
+    Cache persistente em disco com um arquivo por chave e despejo LRU limitado por
+    tamanho. O horário de acesso (atime) de cada arquivo marca o último uso e o de
+    modificação marca a gravação; com `ttl` (segundos), entradas mais antigas que
+    isso são descartadas na leitura. O total em bytes é mantido a cada gravação, então
+    o diretório só é percorrido quando o limite é ultrapassado.
+    """
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total = sum(tamanho for _atime, tamanho, _path in self._entradas())
+
+    def _entradas(self):
+        # (atime, tamanho, caminho) de cada entrada gravada, ignorando escritas em andamento
+        entradas = []
+        for path in self.directory.iterdir():
+            if path.suffix == '.tmp':
+                continue
+            try:
+                info = path.stat()
+            except OSError:
+                continue
+            entradas.append((info.st_atime, info.st_size, path))
+        return entradas
+
+    def _valid_path(self, key):
+        # Caminho da entrada se ela existe e não expirou; marca o acesso para o LRU
+        path = self.directory / key
+        try:
+            info = path.stat()
+            if self.ttl and time.time() - info.st_mtime > self.ttl:
+                path.unlink()
+                with self._lock:
+                    self._total -= info.st_size
+                return None
+            os.utime(path, (time.time(), info.st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def get(self, key):
+        path = self._valid_path(key)
+        try:
+            data = path.read_bytes() if path else None
+        except OSError:
+            data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        path = self.directory / key
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        self._commit(tmp_path, path)
+
+    def get_file(self, key, destino):
+        """Copia a entrada para `destino` sem carregá-la inteira na memória."""
+        path = self._valid_path(key)
+        try:
+            ok = bool(path) and bool(shutil.copyfile(path, destino))
+        except OSError:
+            ok = False
+        with self._lock:
+            if ok:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return ok
+
+    def set_file(self, key, origem):
+        path = self.directory / key
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(origem, tmp_path)
+        self._commit(tmp_path, path)
+
+    def get_text(self, key):
+        data = self.get(key)
+        return data.decode('utf-8') if data is not None else None
+
+    def set_text(self, key, text):
+        self.set(key, text.encode('utf-8'))
+
+    def _commit(self, tmp_path, path):
+        # Publica a entrada e atualiza o total; uma entrada substituída deixa de contar
+        novo = tmp_path.stat().st_size
+        with self._lock:
+            try:
+                antigo = path.stat().st_size
+            except OSError:
+                antigo = 0
+            os.replace(tmp_path, path)
+            self._total += novo - antigo
+            excedeu = self._total > self.max_bytes
+        if excedeu:
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            # Recontagem completa: corrige o total com gravações feitas por outros processos
+            entradas = self._entradas()
+            total = sum(tamanho for _atime, tamanho, _path in entradas)
+            for _atime, tamanho, path in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= tamanho
+                except OSError:
+                    pass
+            self._total = total
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def resumo(self):
+        return f"{self.hits} acertos, {self.misses} faltas ({self.hit_rate:.0%})"
+
+def hash_file(path, block_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(block_size), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def copy_and_hash(src, dst, block_size=1024 * 1024):
+    # Copia em blocos calculando o SHA-256 no caminho, sem uma segunda leitura do arquivo
+    sha = hashlib.sha256()
+    for bloco in iter(lambda: src.read(block_size), b''):
+        sha.update(bloco)
+        dst.write(bloco)
+    return sha.hexdigest()
+
+def job_fingerprint(*partes):
+    return hashlib.sha256("\0".join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+
+def load_artifacts(cache, job_key, nomes):
+    """Devolve {nome: bytes} se todos os artefatos do job estiverem no cache, senão None."""
+    if not job_key:
+        return None
+    artefatos = {}
+    for nome in nomes:
+        data = cache.get(job_fingerprint(job_key, nome))
+        if data is None:
+            return None
+        artefatos[nome] = data
+    return artefatos
+
+def store_artifacts(cache, job_key, artefatos):
+    if not job_key:
+        return
+    for nome, data in artefatos.items():
+        cache.set(job_fingerprint(job_key, nome), data)
+
+def load_artifact_files(cache, job_key, destinos):
+    """
+    Versão em disco de `load_artifacts`: copia cada artefato para o caminho em
+    `destinos` ({nome: caminho}). Devolve `destinos` se todos estavam no cache.
+    """
+    if not job_key:
+        return None
+    for nome, destino in destinos.items():
+        if not cache.get_file(job_fingerprint(job_key, nome), destino):
+            return None
+    return destinos
+
+def store_artifact_files(cache, job_key, origens):
+    if not job_key:
+        return
+    for nome, origem in origens.items():
+        cache.set_file(job_fingerprint(job_key, nome), origem)
+
+def transcription_cache_key(chunk_path, model, language, response_format, prompt=""):
+    # A chave depende do conteúdo do áudio, não do nome (aleatório) do arquivo temporário
+    parametros = "\0".join([hash_file(chunk_path), model, language, response_format, prompt or ""])
+    return hashlib.sha256(parametros.encode('utf-8')).hexdigest()
+
+########################################
+#FUNÇÃO DE ARQUIVOS DE VÍDEO DA SESSÃO
+########################################
+def _remove_spool_file(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        logger.info(f"Arquivo temporário da sessão removido: {path}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Não foi possível remover o arquivo de vídeo {path}: {str(e)}")
+
+class VideoSpool:
+    """
+    Cópia local do vídeo de uma sessão. O arquivo é removido por release() ou, se a
+    sessão terminar sem liberá-lo, quando o objeto é coletado junto com o
+    session_state (ou quando o processo encerra).
+    """
+
+    def __init__(self, fonte, origem, suffix='.mp4'):
+        self.fonte = fonte
+        self.origem = origem
+        self.sha256 = None
+        with tempfile.NamedTemporaryFile(delete=False, prefix=SPOOL_PREFIX, suffix=suffix) as f:
+            self.path = f.name
+        self._finalizer = weakref.finalize(self, _remove_spool_file, self.path)
+
+    def matches(self, origem):
+        # Reaproveitado num rerun: renova o mtime para a varredura não tratar o arquivo como órfão
+        if origem != self.origem or not os.path.exists(self.path):
+            return False
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+        return True
+
+    def release(self):
+        self._finalizer()
+
+class SessionDocuments:
+    """
+    Documentos gerados para a sessão (SRTs e PDFs), mantidos em disco enquanto são
+    oferecidos para download. Como no VideoSpool, o diretório é removido por release()
+    ou quando o objeto é coletado junto com o session_state. Com `sob_demanda`, só o
+    arquivo escolhido pelo usuário é carregado para download (gravações longas).
+    """
+
+    def __init__(self, sob_demanda=False):
+        self.directory = tempfile.mkdtemp(prefix=f"{SPOOL_PREFIX}docs-")
+        self.downloads = {}  # aba -> [(rótulo, caminho, mime)]
+        self.sob_demanda = sob_demanda
+        self.escolhido = None  # caminho do arquivo preparado para download
+        self._finalizer = weakref.finalize(self, _remove_spool_file, self.directory)
+
+    def release(self):
+        self._finalizer()
+
+def sweep_stale_spools(max_age=SPOOL_MAX_AGE, directory=None):
+    """
+    Remove vídeos e documentos de sessões que não foram liberados (processo encerrado
+    à força, por exemplo) e não são usados há mais de `max_age` segundos.
+    """
+    limite = time.time() - max_age
+    for path in Path(directory or tempfile.gettempdir()).glob(f"{SPOOL_PREFIX}*"):
+        try:
+            if path.stat().st_mtime < limite:
+                _remove_spool_file(str(path))
+        except OSError:
+            pass
+
+########################################
+#FUNÇÃO DE DOWNLOAD DE VÍDEOS REMOTOS
+########################################
+def download_to_spool(url, output_path, workers=DOWNLOAD_WORKERS, part_size=DOWNLOAD_PART_SIZE, timeout=60):
+    """
+    Baixa `url` para `output_path` usando `workers` requisições HTTP Range em paralelo.
+    Quando o servidor não aceita Range, cai para um único stream. Retorna o SHA-256
+    do arquivo baixado, usado como impressão digital do vídeo.
+    """
+    # Uma requisição de 1 byte revela o suporte a Range e o tamanho total (Content-Range)
+    resposta = requests.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=timeout)
+    if resposta.status_code != 416:
+        resposta.raise_for_status()
+    match = re.match(r'bytes 0-0/(\d+)', resposta.headers.get('Content-Range', ''))
+    if resposta.status_code != 206 or not match:
+        logger.info(f"Servidor sem suporte a Range, baixando em um único stream: {url}")
+        if resposta.status_code != 200:
+            # Resposta parcial sem tamanho total (ex.: "bytes 0-0/*") ou Range recusado:
+            # o corpo recebido não é o arquivo inteiro, então é preciso pedir tudo de novo
+            resposta.close()
+            resposta = requests.get(url, stream=True, timeout=timeout)
+            resposta.raise_for_status()
+        # Com 200 o servidor ignorou o Range e já está enviando o arquivo inteiro
+        resposta.raw.decode_content = True
+        with resposta, open(output_path, 'wb') as f:
+            return copy_and_hash(resposta.raw, f, block_size=1024 * 1024)
+    resposta.close()
+
+    tamanho = int(match.group(1))
+    partes = [(inicio, min(inicio + part_size, tamanho) - 1) for inicio in range(0, tamanho, part_size)]
+    logger.info(f"Baixando {tamanho / (1024 * 1024):.2f} MB em {len(partes)} partes com {workers} conexões")
+
+    with open(output_path, 'wb') as f:
+        f.truncate(tamanho)
+
+    sessoes = threading.local()
+
+    def baixa_parte(inicio, fim):
+        if not hasattr(sessoes, 'session'):
+            sessoes.session = requests.Session()
+        for tentativa in range(1, DOWNLOAD_RETRIES + 1):
+            try:
+                with sessoes.session.get(url, headers={'Range': f'bytes={inicio}-{fim}'},
+                                         stream=True, timeout=timeout) as parte:
+                    if parte.status_code != 206:
+                        raise RuntimeError(f"Resposta inesperada para a parte {inicio}-{fim}: {parte.status_code}")
+                    with open(output_path, 'r+b') as f:
+                        f.seek(inicio)
+                        recebidos = 0
+                        for bloco in parte.iter_content(chunk_size=1024 * 1024):
+                            f.write(bloco)
+                            recebidos += len(bloco)
+                if recebidos != fim - inicio + 1:
+                    raise RuntimeError(f"Parte {inicio}-{fim} incompleta: {recebidos} bytes")
+                return
+            except Exception as e:
+                if tentativa == DOWNLOAD_RETRIES:
+                    raise
+                logger.warning(f"Falha na parte {inicio}-{fim} (tentativa {tentativa}): {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for future in [executor.submit(baixa_parte, inicio, fim) for inicio, fim in partes]:
+            future.result()
+
+    return hash_file(output_path)
+
+########################################
+#FUNÇÃO DE LIMITE DE REQUISIÇÕES À API
+########################################
+def com_retry(fn, descricao, max_retries):
+    """
+    Chama fn(tentativa) até dar certo, com espera exponencial (2, 4, 8... segundos)
+    entre as tentativas; a exceção da última tentativa é propagada. `descricao`
+    completa a mensagem de aviso ("Falha <descricao> (tentativa 1/3): ...").
+    """
+    for tentativa in range(1, max_retries + 1):
+        try:
+            return fn(tentativa)
+        except Exception as e:
+            if tentativa == max_retries:
+                raise
+            espera = 2 ** tentativa
+            logger.warning(f"Falha {descricao} (tentativa {tentativa}/{max_retries}): {str(e)}. "
+                           f"Nova tentativa em {espera}s")
+            time.sleep(espera)
+
+def _reabastece(niveis, capacidades, decorrido):
+    # Cada balde enche `capacidade` unidades por minuto, até a própria capacidade
+    return tuple(min(cap, nivel + cap * decorrido / 60) if cap else nivel
+                 for nivel, cap in zip(niveis, capacidades))
+
+def _espera_necessaria(niveis, pedido, capacidades):
+    # Segundos até todos os baldes terem o pedido (limitado à capacidade, senão nunca caberia)
+    espera = 0.0
+    for nivel, quantidade, cap in zip(niveis, pedido, capacidades):
+        if cap:
+            falta = min(quantidade, cap) - nivel
+            espera = max(espera, falta * 60 / cap)
+    return espera
+
+def _consome(niveis, pedido, capacidades):
+    return tuple(nivel - min(quantidade, cap) if cap else nivel
+                 for nivel, quantidade, cap in zip(niveis, pedido, capacidades))
+
+class MemoryBuckets:
+    """Baldes de requisições e de unidades (tokens ou segundos de áudio) na memória do processo."""
+
+    def __init__(self, rpm, units_per_minute):
+        self.capacidades = (rpm, units_per_minute)
+        self._niveis = self.capacidades
+        self._atualizado = time.monotonic()
+
+    def peek(self):
+        agora = time.monotonic()
+        self._niveis = _reabastece(self._niveis, self.capacidades, agora - self._atualizado)
+        self._atualizado = agora
+        return self._niveis
+
+    def try_acquire(self, pedido):
+        espera = _espera_necessaria(self.peek(), pedido, self.capacidades)
+        if espera <= 0:
+            self._niveis = _consome(self._niveis, pedido, self.capacidades)
+        return max(0.0, espera)
+
+class SqliteBuckets:
+    """
+    Os mesmos baldes guardados num arquivo SQLite, para que vários processos (ex.:
+    várias réplicas do app na mesma máquina) dividam um único orçamento.
+    """
+
+    def __init__(self, path, nome, rpm, units_per_minute):
+        self.path = str(path)
+        self.nome = nome
+        self.capacidades = (rpm, units_per_minute)
+        with closing(self._conecta()) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets "
+                       "(nome TEXT PRIMARY KEY, requisicoes REAL, unidades REAL, atualizado REAL)")
+            db.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, ?)", (nome, rpm, units_per_minute, time.time()))
+
+    def _conecta(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _transacao(self, pedido=None):
+        with closing(self._conecta()) as db:
+            db.execute("BEGIN IMMEDIATE")  # Trava a escrita: leitura e atualização atômicas entre processos
+            try:
+                requisicoes, unidades, atualizado = db.execute(
+                    "SELECT requisicoes, unidades, atualizado FROM buckets WHERE nome = ?", (self.nome,)).fetchone()
+                agora = time.time()
+                niveis = _reabastece((requisicoes, unidades), self.capacidades, max(0.0, agora - atualizado))
+                espera = _espera_necessaria(niveis, pedido, self.capacidades) if pedido else 0.0
+                if pedido and espera <= 0:
+                    niveis = _consome(niveis, pedido, self.capacidades)
+                db.execute("UPDATE buckets SET requisicoes = ?, unidades = ?, atualizado = ? WHERE nome = ?",
+                           (*niveis, agora, self.nome))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return niveis, max(0.0, espera)
+
+    def peek(self):
+        return self._transacao()[0]
+
+    def try_acquire(self, pedido):
+        return self._transacao(pedido)[1]
+
+class RateLimiter:
+    """
+    Token bucket com orçamento separado de requisições por minuto e de unidades por
+    minuto (tokens no chat, segundos de áudio na transcrição). Quem chama espera a
+    sua vez em fila FIFO, em vez de disparar requisições que voltariam com 429.
+    """
+
+    def __init__(self, nome, rpm, units_per_minute, buckets=None):
+        self.nome = nome
+        self.buckets = buckets or MemoryBuckets(rpm, units_per_minute)
+        self._cond = threading.Condition()
+        self._fila = deque()
+        self._demanda = [0, 0]  # requisições e unidades aguardando na fila
+        self.esperas = 0
+        self.tempo_espera = 0.0
+
+    def acquire(self, units=1):
+        pedido = (1, units)
+        ticket = object()
+        inicio = time.monotonic()
+        with self._cond:
+            self._fila.append(ticket)
+            self._demanda[0] += 1
+            self._demanda[1] += units
+            try:
+                while True:
+                    if self._fila[0] is ticket:
+                        espera = self.buckets.try_acquire(pedido)
+                        if espera <= 0:
+                            break
+                        # Só a cabeça da fila consome; as demais acordam quando ela sair
+                        self._cond.wait(min(espera, 1.0))
+                    else:
+                        self._cond.wait()
+            finally:
+                self._fila.remove(ticket)
+                self._demanda[0] -= 1
+                self._demanda[1] -= units
+                self._cond.notify_all()
+            esperado = time.monotonic() - inicio
+            if esperado > 0.05:
+                self.esperas += 1
+                self.tempo_espera += esperado
+        if esperado > 1:
+            logger.info(f"Limite de uso '{self.nome}': aguardou {esperado:.1f}s na fila")
+        return esperado
+
+    def wait_time(self, units=1):
+        """Estimativa de quanto uma nova chamada esperaria agora, considerando a fila à frente dela."""
+        with self._cond:
+            pedido = (self._demanda[0] + 1, self._demanda[1] + units)
+            return max(0.0, _espera_necessaria(self.buckets.peek(), pedido, self.buckets.capacidades))
+
+    def resumo(self):
+        return f"{self.esperas} chamadas aguardaram, {self.tempo_espera:.1f}s no total"
+
+def create_rate_limiter(nome, rpm, units_per_minute, db_path=RATE_LIMIT_DB):
+    buckets = SqliteBuckets(db_path, nome, rpm, units_per_minute) if db_path else None
+    return RateLimiter(nome, rpm, units_per_minute, buckets)
+
 ###############################################
 #FUNÇÃO DE EXTRAÇÃO DE VÍDEO NO VIMEO E YOUTUBE
 ###############################################
@@ -199,32 +1419,300 @@ def get_video_download_url(youtube, video_id):
 #FUNÇÃO DE PROCESSAMENTO E DOWNLOAD DO ARQUIVO SRT
 ########################################
 
-def processa_srt(srt_content):
-    subtitles = list(srt.parse(srt_content))
-    transcript_text = ""
-    for sub in subtitles:
-        # Limpa os asteriscos do conteúdo
-        sub.content = sub.content.replace('*', '')
-        start_time = str(sub.start).split('.')[0]  # Remove microssegundos
-        transcript_text += f"{start_time} - {sub.content}\n"
-    return transcript_text
-
-
-def create_download_link(file_path, link_text):
-    with open(file_path, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    href = f'<a href="data:file/txt;base64,{b64}" download="{os.path.basename(file_path)}">{link_text}</a>'
-    return href
-
-def processa_srt_sem_timestamp(srt_content):
-    subtitles = list(srt.parse(srt_content))
-    transcript_text = ""
-    for sub in subtitles:
-        # Limpa os asteriscos do conteúdo
-        sub.content = sub.content.replace('*', '')
-        transcript_text += f"{sub.content}\n"
-    return transcript_text
+class Segment:
+    """Legenda da transcrição: início e fim em milissegundos e o texto já limpo."""
+    __slots__ = ('start_ms', 'end_ms', 'text')
+
+    def __init__(self, start_ms, end_ms, text):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+
+    def __repr__(self):
+        return f"Segment({self.start_ms}, {self.end_ms}, {self.text!r})"
+
+
+def formata_tempo_srt(ms):
+    # 3723004 -> "01:02:03,004"
+    segundos, ms = divmod(int(ms), 1000)
+    minutos, segundos = divmod(segundos, 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d},{ms:03d}"
+
+
+def formata_segmento_srt(indice, seg):
+    return f"{indice}\n{formata_tempo_srt(seg.start_ms)} --> {formata_tempo_srt(seg.end_ms)}\n{seg.text}\n\n"
+
+
+_TEMPO_SRT = re.compile(r'(\d+):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})')
+
+
+def _tempo_srt_ms(horas, minutos, segundos, fracao):
+    return ((int(horas) * 60 + int(minutos)) * 60 + int(segundos)) * 1000 + int(fracao.ljust(3, '0'))
+
+
+def iter_srt_segments(linhas):
+    """
+    Lê um SRT linha a linha (arquivo aberto ou lista de linhas) e produz os
+    segmentos sem carregar o arquivo inteiro. O texto é tudo o que vem entre a
+    linha de tempos e a linha em branco, inclusive legendas que são só números.
+    """
+    tempos = None
+    texto = []
+    for linha in linhas:
+        linha = linha.rstrip('\r\n')
+        if tempos is None:
+            match = _TEMPO_SRT.search(linha)
+            if match:
+                grupos = match.groups()
+                tempos = (_tempo_srt_ms(*grupos[:4]), _tempo_srt_ms(*grupos[4:]))
+            continue  # Índice da legenda ou linhas em branco extras
+        if linha.strip():
+            texto.append(linha)
+        else:
+            yield Segment(tempos[0], tempos[1], "\n".join(texto).replace('*', ''))
+            tempos = None
+            texto = []
+    if tempos is not None:
+        yield Segment(tempos[0], tempos[1], "\n".join(texto).replace('*', ''))
+
+
+def iter_srt_blocks(segments):
+    for i, seg in enumerate(segments, start=1):
+        yield formata_segmento_srt(i, seg)
+
+
+def iter_text_lines(segments):
+    for seg in segments:
+        yield f"{seg.text}\n"
+
+
+def iter_timestamped_lines(segments):
+    for seg in segments:
+        minutos, segundos = divmod(seg.start_ms // 1000, 60)
+        horas, minutos = divmod(minutos, 60)
+        yield f"{horas}:{minutos:02d}:{segundos:02d} - {seg.text}\n"
+
+
+def iter_paragraphs(linhas, por_paragrafo=10):
+    # Agrupa linhas de legenda em parágrafos de tamanho fixo para o PDF
+    bloco = []
+    for linha in linhas:
+        if linha.strip():
+            bloco.append(" ".join(linha.split()))
+        if len(bloco) == por_paragrafo:
+            yield " ".join(bloco)
+            bloco = []
+    if bloco:
+        yield " ".join(bloco)
+
+
+_PEDACOS_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(texto):
+    """
+    Estimativa local (sem rede) de tokens de um texto: cada palavra conta um token a
+    cada ~4 caracteres e cada sinal de pontuação conta um. Para português fica
+    próxima dos tokenizadores BPE usuais, com folga para cima.
+    """
+    return sum(-(-len(pedaco) // 4) for pedaco in _PEDACOS_TOKEN.findall(texto))
+
+
+def iter_token_groups(segments, max_tokens, min_span_ms=0, max_span_ms=None):
+    """
+    Agrupa segmentos consecutivos até `max_tokens` estimados por grupo. Um grupo só
+    é fechado pelo orçamento depois de cobrir `min_span_ms` e nunca passa de
+    `max_span_ms`, para que cada legenda do resumo tenha uma duração legível. Todo
+    segmento entra em exatamente um grupo.
+    """
+    grupo = []
+    tokens = 0
+    for seg in segments:
+        seg_tokens = estimate_tokens(seg.text)
+        if grupo:
+            estoura_orcamento = tokens + seg_tokens > max_tokens and seg.start_ms - grupo[0].start_ms >= min_span_ms
+            estoura_duracao = max_span_ms is not None and seg.end_ms - grupo[0].start_ms > max_span_ms
+            if estoura_orcamento or estoura_duracao:
+                yield grupo
+                grupo = []
+                tokens = 0
+        grupo.append(seg)
+        tokens += seg_tokens
+    if grupo:
+        yield grupo
+
+
+def write_lines(path, linhas):
+    with open(path, 'w', encoding='utf-8') as f:
+        for linha in linhas:
+            f.write(linha)
+    return path
+
+
+def shift_segments(segments, offset, offset_map=None):
+    """
+    Desloca os segmentos de um chunk para o tempo do vídeo. Com `offset_map`, os
+    tempos do áudio sem silêncios são levados de volta ao tempo original.
+    """
+    offset_ms = round(offset * 1000)
+    for seg in segments:
+        if offset_map:
+            start_ms = round(offset_map.to_original(seg.start_ms / 1000 + offset) * 1000)
+            end_ms = round(offset_map.to_original(seg.end_ms / 1000 + offset, fim=True) * 1000)
+            yield Segment(start_ms, max(start_ms, end_ms), seg.text)
+        else:
+            yield Segment(seg.start_ms + offset_ms, seg.end_ms + offset_ms, seg.text)
+
+
+class BaseTranscript:
+    """Saídas comuns a qualquer transcrição que produza seus segmentos em ordem."""
+    __slots__ = ()
+
+    def iter_srt(self):
+        return iter_srt_blocks(self)
+
+    def iter_text(self):
+        return iter_text_lines(self)
+
+    def iter_timestamped_text(self):
+        return iter_timestamped_lines(self)
+
+    def write_srt(self, path):
+        return write_lines(path, self.iter_srt())
+
+
+class Transcript(BaseTranscript):
+    """
+    Transcrição analisada uma única vez. O SRT devolvido pela API é convertido em
+    segmentos e todas as saídas (SRT, texto puro, texto com horário e entrada do
+    PDF) são geradas diretamente a partir deles, sem novos ciclos parse/compose.
+    """
+    __slots__ = ('segments',)
+
+    def __init__(self, segments=None):
+        self.segments = list(segments or [])
+
+    @classmethod
+    def from_srt(cls, srt_content):
+        return cls(iter_srt_segments(srt_content.splitlines()))
+
+    @classmethod
+    def coerce(cls, conteudo):
+        # Aceita tanto um Transcript quanto o texto SRT (ex.: vindo do cache)
+        return conteudo if isinstance(conteudo, BaseTranscript) else cls.from_srt(conteudo)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __bool__(self):
+        return bool(self.segments)
+
+
+class TranscriptFile(BaseTranscript):
+    """
+    Transcrição longa mantida em disco como SRT. Cada iteração relê o arquivo em
+    streaming, então a memória usada não depende da duração da gravação.
+    """
+    __slots__ = ('path', 'count')
+
+    def __init__(self, path, count=None):
+        self.path = str(path)
+        self.count = count
+
+    def __iter__(self):
+        with open(self.path, encoding='utf-8') as f:
+            yield from iter_srt_segments(f)
+
+    def __len__(self):
+        if self.count is None:
+            self.count = sum(1 for _seg in self)
+        return self.count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def write_srt(self, path):
+        # O arquivo já está em SRT numerado: basta copiá-lo
+        shutil.copyfile(self.path, path)
+        return path
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SrtMerger:
+    """
+    Junta os segmentos de vários chunks num único SRT, numa só passada linear:
+    aplica o deslocamento de cada chunk, numera as legendas globalmente e escreve
+    cada uma direto em `destino` (arquivo ou buffer de texto) assim que sai da
+    janela de reordenação.
+
+    Segmentos fora de ordem nas bordas dos chunks são reordenados por um heap de
+    até `janela` itens; o que chegar atrasado além disso (ou começar no mesmo
+    instante da legenda retida) tem o texto juntado ao dessa legenda, sem criar
+    legendas de duração zero nem perder texto. Sobreposições são resolvidas
+    encurtando a legenda anterior, que fica retida até o início da próxima ser
+    conhecido.
+    Com `coleta=True` os segmentos finais também são guardados em `transcript`;
+    `ao_escrever`, se dado, recebe cada segmento assim que ele é escrito.
+    """
+
+    def __init__(self, destino, janela=SRT_REORDER_WINDOW, coleta=True, ao_escrever=None):
+        self.destino = destino
+        self.janela = max(1, janela)
+        self.transcript = Transcript() if coleta else None
+        self.ao_escrever = ao_escrever
+        self.count = 0
+        self._heap = []
+        self._seq = 0
+        self._pendente = None
+
+    def add_chunk(self, segments, offset=0, offset_map=None):
+        for seg in shift_segments(segments, offset, offset_map):
+            self.add(seg)
+
+    def add(self, seg):
+        heapq.heappush(self._heap, (seg.start_ms, self._seq, seg))
+        self._seq += 1
+        if len(self._heap) > self.janela:
+            self._emite(heapq.heappop(self._heap)[2])
+
+    def close(self):
+        while self._heap:
+            self._emite(heapq.heappop(self._heap)[2])
+        if self._pendente:
+            self._escreve(self._pendente)
+            self._pendente = None
+        return self.count
+
+    def _emite(self, seg):
+        anterior = self._pendente
+        if anterior and seg.start_ms <= anterior.start_ms:
+            # Chegou tarde demais para a janela: junta o texto à legenda retida
+            self._pendente = Segment(anterior.start_ms, max(anterior.end_ms, seg.end_ms),
+                                     f"{anterior.text} {seg.text}")
+            return
+        self._pendente = seg
+        if anterior:
+            if anterior.end_ms > seg.start_ms:
+                anterior = Segment(anterior.start_ms, max(anterior.start_ms, seg.start_ms), anterior.text)
+            self._escreve(anterior)
+
+    def _escreve(self, seg):
+        self.count += 1
+        self.destino.write(formata_segmento_srt(self.count, seg))
+        if self.transcript is not None:
+            self.transcript.segments.append(seg)
+        if self.ao_escrever:
+            self.ao_escrever(seg)
+
 
 def gera_srt_do_resumo(resumo, duracao_total_segundos):
     linhas = resumo.split('\n')
@@ -260,44 +1748,56 @@ def gera_srt_do_resumo(resumo, duracao_total_segundos):
     # Gera o conteúdo SRT limpo
     return srt.compose(subtitles)
 
-def ajusta_tempo_srt(srt_content, offset):
-    subtitles = list(srt.parse(srt_content))
-    for sub in subtitles:
-        # Limpa os asteriscos do conteúdo
-        sub.content = sub.content.replace('*', '')
-        sub.start += datetime.timedelta(seconds=offset)
-        sub.end += datetime.timedelta(seconds=offset)
-    return srt.compose(subtitles)
-
 ########################################
 #FUNÇÃO DE CRIAÇÃO E DOWNLOAD DE ARQUIVO PDF
 ########################################
-def create_pdf(content, filename):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+class FlowableStream(list):
+    """
+    Lista de flowables que se reabastece de um gerador conforme o reportlab consome
+    o início dela: só `buffer` parágrafos ficam montados na memória por vez, em vez
+    do documento inteiro antes do `doc.build`.
+    """
+
+    def __init__(self, gerador, buffer=64):
+        super().__init__()
+        self._gerador = gerador
+        self._buffer = buffer
+
+    def _abastece(self):
+        while self._gerador is not None and list.__len__(self) < self._buffer:
+            try:
+                self.append(next(self._gerador))
+            except StopIteration:
+                self._gerador = None
+
+    def __len__(self):
+        self._abastece()
+        return list.__len__(self)
+
+    def __getitem__(self, indice):
+        self._abastece()
+        return list.__getitem__(self, indice)
+
+
+def _novo_documento_pdf(destino):
+    doc = SimpleDocTemplate(destino, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
     
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name='Justify', alignment=TA_JUSTIFY))
-    flowables = []
-
-    # Dividir o conteúdo em parágrafos
-    paragraphs = content.split('\n\n')  # Assume que parágrafos são separados por linha em branco
+    return doc, styles['Justify']
 
+def _pdf_flowables(paragraphs, estilo):
     for paragraph in paragraphs:
         if paragraph.strip():
             # Remove qualquer numeração ou formatação especial
             clean_paragraph = re.sub(r'^\d+\.\s*', '', paragraph.strip())
             clean_paragraph = re.sub(r'\*\*(.*?)\*\*', r'\1', clean_paragraph)  # Remove negrito (**)
             
-            p = Paragraph(clean_paragraph, styles['Justify'])
-            flowables.append(p)
-            flowables.append(Spacer(1, 12))  # Espaçamento entre parágrafos
-
-    doc.build(flowables)
-    buffer.seek(0)
-    return buffer
-
-def create_download_link_pdf(pdf_buffer, link_text, filename):
-    b64 = base64.b64encode(pdf_buffer.getvalue()).decode()
-    href = f'<a href="data:application/pdf;base64,{b64}" download="{filename}">{link_text}</a>'
-    return href
\ No newline at end of file
+            yield Paragraph(clean_paragraph, estilo)
+            yield Spacer(1, 12)  # Espaçamento entre parágrafos
+
+def create_pdf_file(paragraphs, path):
+    """Gera o PDF direto em `path` a partir de um iterável de parágrafos, em streaming."""
+    doc, estilo = _novo_documento_pdf(str(path))
+    doc.build(FlowableStream(_pdf_flowables(paragraphs, estilo)))
+    return path